@@ -0,0 +1,172 @@
+"""以本機模擬伺服器（bench.mock_server）跑各網站爬蟲的完整流程，回報吞吐量與資源用量
+
+每個網站在獨立的子行程中執行 main()，CPU 時間與記憶體峰值互不干擾。回報：
+laws/sec、請求延遲 p50/p95（爬蟲端在傳輸層量測，含 urllib3 的重試）、CPU 秒數、RSS 峰值，
+以及 lawcrawler.metrics 中總耗時最多的階段。
+未知的參數原樣交給爬蟲，例如 --engine async、--workers 16、--parser lxml。
+
+    python -m bench.crawl --laws 200 --latency 0.05 --error-rate 0.01
+    python -m bench.crawl --sites taipei ntpc -- --engine async --concurrency 50
+"""
+import argparse
+import glob
+import gzip
+import importlib
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench import mock_server
+from lawcrawler.corpus import SITE_DIRS
+
+# 網站代號與輸出目錄
+OUTPUT_DIRS = {site: directory for directory, site in SITE_DIRS.items()}
+
+# 模擬伺服器不限速，預設放寬各主機的限速，量到的是爬蟲本身的處理能力；指標摘要改由這裡回報，不寫檔
+DEFAULT_CRAWLER_ARGS = ['--rate', '10000', '--burst', '1000', '--metrics-dir', '']
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def record_latencies(latencies):
+    """量測每個 HTTP 請求的耗時：包裝 requests 的傳輸層與 async 引擎的 get"""
+    from lawcrawler import async_fetch, session
+
+    lock = threading.Lock()
+    send = session.CrawlerAdapter._send
+
+    def timed_send(self, request, **kwargs):
+        started = time.perf_counter()
+        try:
+            return send(self, request, **kwargs)
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    get = async_fetch.AsyncFetcher.get
+
+    async def timed_get(self, url, timeout=None):
+        started = time.perf_counter()
+        try:
+            return await get(self, url, timeout)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    session.CrawlerAdapter._send = timed_send
+    async_fetch.AsyncFetcher.get = timed_get
+
+
+def count_output(directory):
+    """計算輸出目錄中的法規數（逐檔 JSON 或 JSONL 分片）"""
+    laws = len(glob.glob(os.path.join(directory, '*.json')))
+    for path in glob.glob(os.path.join(directory, '*.jsonl*')):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            laws += sum(1 for line in f if line.strip())
+    return laws
+
+
+def run_child(site, crawler_argv):
+    """子行程：在暫存目錄中執行單一網站的爬蟲，最後一行輸出 JSON 結果"""
+    # 先設定日誌，爬蟲模組的 basicConfig 便不再生效，輸出只保留警告
+    logging.basicConfig(level=logging.WARNING)
+    from lawcrawler import metrics, parsing
+    from lawcrawler.cli import configure, parse_args
+
+    workdir = tempfile.mkdtemp(prefix=f"bench-{site}-")
+    os.chdir(workdir)
+    sites = importlib.import_module('全部法規').SITES
+    module = importlib.import_module(sites[site])
+    args = parse_args(f"benchmark {site}", DEFAULT_CRAWLER_ARGS + crawler_argv)
+    configure(args)
+
+    latencies = []
+    record_latencies(latencies)
+    started = time.perf_counter()
+    module.main(args)
+    elapsed = time.perf_counter() - started
+    # --parse-processes 的解析行程要結束並被回收後，其 CPU 時間才會計入 RUSAGE_CHILDREN
+    parsing.shutdown()
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    laws = count_output(OUTPUT_DIRS[site])
+    stages = metrics.default_registry.stage_totals()
+    busiest = max(stages, key=stages.get)
+    busy = sum(stages.values())
+    os.chdir(tempfile.gettempdir())
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps({
+        'site': site,
+        'laws': laws,
+        'seconds': elapsed,
+        'laws_per_sec': laws / elapsed if elapsed else 0.0,
+        'requests': len(latencies),
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'cpu_seconds': usage.ru_utime + usage.ru_stime + children.ru_utime + children.ru_stime,
+        # Linux 的 ru_maxrss 單位為 KB
+        'peak_rss_mb': max(usage.ru_maxrss, children.ru_maxrss) / 1024,
+        'top_stage': busiest,
+        'top_stage_share': stages[busiest] / busy if busy else 0.0,
+    }))
+
+
+def run_site(site, url, crawler_argv):
+    env = dict(os.environ, LAWCRAWLER_HOST_OVERRIDE=url)
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-m', 'bench.crawl', '--child', site, *crawler_argv],
+                            cwd=repo, env=env, capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"{site} crawler failed:\n{result.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="以本機模擬伺服器比較各網站爬蟲的吞吐量")
+    parser.add_argument('--sites', nargs='+', choices=list(OUTPUT_DIRS), default=list(OUTPUT_DIRS),
+                        help='要測試的網站，預設全部')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    mock_server.add_arguments(parser)
+    args, crawler_argv = parser.parse_known_args(argv)
+    crawler_argv = [arg for arg in crawler_argv if arg != '--']
+    if args.child:
+        run_child(args.child, crawler_argv)
+        return
+
+    sites = mock_server.sites_from_args(args)
+    server, url = mock_server.start(sites)
+    print(f"Mock sites on {url}: {args.laws} laws per site, latency {args.latency * 1000:.0f} ms "
+          f"(+{args.jitter * 1000:.0f} ms jitter), error rate {args.error_rate:.1%}")
+    print(f"{'site':<10} {'laws':>6} {'sec':>7} {'laws/s':>8} {'reqs':>6} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'CPU s':>6} {'RSS MB':>7}  top stage")
+    try:
+        for site in args.sites:
+            try:
+                r = run_site(site, url, crawler_argv)
+            except RuntimeError as e:
+                print(e)
+                continue
+            print(f"{site:<10} {r['laws']:>6} {r['seconds']:>7.2f} {r['laws_per_sec']:>8.1f} {r['requests']:>6} "
+                  f"{r['p50_ms']:>7.1f} {r['p95_ms']:>7.1f} {r['cpu_seconds']:>6.2f} {r['peak_rss_mb']:>7.1f}  "
+                  f"{r['top_stage']} ({r['top_stage_share']:.0%})")
+    finally:
+        server.shutdown()
+    print(f"Mock server answered {sites.requests} requests ({sites.errors} injected errors)")
+
+
+if __name__ == '__main__':
+    main()
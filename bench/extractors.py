@@ -0,0 +1,207 @@
+"""各網站法規擷取函式的微基準測試與黃金輸出比對
+
+以 bench.pages 產生的短、中、長三種篇幅法規頁，量測每個擷取函式的 ms/page，並確認輸出與
+bench/golden/ 中的黃金 JSON 逐位元組相同。量測的是 get_law_json / get_law_content /
+try_get_content 內部呼叫的解析函式，不經過網路、快取與封存。
+
+    python -m bench.extractors                         # 比對黃金輸出並量測
+    python -m bench.extractors --parser lxml --targeted
+    python -m bench.extractors --save before.json      # 記錄本次 ms/page
+    python -m bench.extractors --compare before.json --max-slowdown 1.2
+    python -m bench.extractors --update                # 解析結果刻意改變時重新產生黃金輸出
+
+篇幅較長的黃金輸出以 gzip 壓縮（mtime 固定為 0，內容相同時檔案也相同）。
+"""
+import argparse
+import difflib
+import gzip
+import importlib
+import json
+import logging
+import os
+import statistics
+import time
+
+# 先設定日誌，匯入爬蟲時其 basicConfig 便不再生效，基準測試輸出不會混入爬蟲日誌
+logging.basicConfig(level=logging.WARNING)
+
+from bench import pages  # noqa: E402
+from lawcrawler import parsing  # noqa: E402
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+
+# 篇幅：條文數；長篇以民法的條文數為準
+SIZES = {
+    'small': 5,
+    'median': 40,
+    'huge': 1200,
+}
+# 這些篇幅的黃金輸出以 gzip 儲存
+COMPRESSED_SIZES = {'huge'}
+
+
+def extractor_cases(articles):
+    """回傳 (名稱, 頁面清單, 擷取函式)；擷取函式接受頁面清單，依序呼叫網站的解析函式"""
+    central = importlib.import_module('中央法規')
+    taipei = importlib.import_module('台北市法規')
+    taichung = importlib.import_module('台中市法規')
+    ntpc = importlib.import_module('新北市法規')
+    taoyuan = importlib.import_module('桃園市法規')
+    kaohsiung = importlib.import_module('高雄市法規')
+
+    content_url = 'https://www.laws.taipei.gov.tw/Law/LawSearch/LawArticleContent/FL000001'
+    ntpc_info = {'title': '新北市測試自治條例', 'fcode': 'C000001'}
+    law_info = {'name': '測試自治條例', 'url': 'https://example.gov.tw/LawContent.aspx?id=1', 'date': '2023-08-09'}
+
+    def taipei_law(info_html, content_html):
+        # 與 get_law_json 相同：先解析資訊頁，再把條文加入同一份資料
+        return taipei.parse_law_articles(content_html, taipei.parse_law_info(info_html, content_url))
+
+    return [
+        ('central', [pages.central_law_page('測試法', articles)],
+         lambda html: central.parse_law_json(html, 'https://law.moj.gov.tw/LawClass/LawAll.aspx?PCODE=A0000001')),
+        ('taipei', [pages.taipei_info_page('臺北市測試自治條例'), pages.taipei_content_page(articles)],
+         taipei_law),
+        ('taipei-points', [pages.taipei_info_page('臺北市測試要點'), pages.taipei_content_page(articles, points=True)],
+         taipei_law),
+        ('taichung', [pages.taichung_law_page('臺中市測試自治條例', articles)],
+         lambda html: taichung.parse_law_content(html, 'https://law.taichung.gov.tw/LawContent.aspx?id=1')),
+        ('ntpc-0202', [pages.ntpc_law_page('新北市測試自治條例', articles)],
+         lambda html: ntpc.parse_law_content(html, ntpc_info)),
+        ('ntpc-0201', [pages.ntpc_law_page('新北市測試自治條例', articles, table_class='tab-law')],
+         lambda html: ntpc.parse_law_content(html, ntpc_info)),
+        ('taoyuan', [pages.taoyuan_law_page('桃園市測試自治條例', articles)],
+         lambda html: taoyuan.parse_law_content(html, law_info)),
+        ('kaohsiung', [pages.kaohsiung_law_page('高雄市測試自治條例', articles)],
+         lambda html: kaohsiung.parse_law_content(html, law_info)),
+        ('kaohsiung-spans', [pages.kaohsiung_law_page('高雄市測試自治條例', articles, layout='spans')],
+         lambda html: kaohsiung.parse_law_content(html, law_info)),
+    ]
+
+
+def serialize(output):
+    """黃金輸出的格式：與爬蟲寫出的 JSON 相同（保留中文），外加縮排方便比對差異"""
+    return json.dumps(output, ensure_ascii=False, indent=2) + "\n"
+
+
+def golden_path(name, size):
+    suffix = '.json.gz' if size in COMPRESSED_SIZES else '.json'
+    return os.path.join(GOLDEN_DIR, f"{name}-{size}{suffix}")
+
+
+def read_golden(path):
+    try:
+        if path.endswith('.gz'):
+            with gzip.open(path, 'rb') as f:
+                return f.read().decode('utf-8')
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_golden(path, text):
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    data = text.encode('utf-8')
+    if path.endswith('.gz'):
+        data = gzip.compress(data, mtime=0)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def show_diff(golden, actual, path, limit=20):
+    diff = difflib.unified_diff(golden.splitlines(), actual.splitlines(), path, 'actual', lineterm='')
+    for i, line in enumerate(diff):
+        if i >= limit:
+            print("    ...")
+            break
+        print(f"    {line}")
+
+
+def time_extractor(extract, html_pages, repeat):
+    """回傳 (每次的毫秒數, 輸出)"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = extract(*html_pages)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="量測各網站法規擷取函式的速度並比對黃金輸出")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES), help='要測試的篇幅')
+    parser.add_argument('--repeat', type=int, default=5, help='每個組合重複次數')
+    parser.add_argument('--parser', choices=['html.parser', 'lxml'], default='html.parser', help='BeautifulSoup 解析後端')
+    parser.add_argument('--targeted', action='store_true', help='只解析需要的子樹')
+    parser.add_argument('--update', action='store_true', help='以本次輸出覆寫黃金輸出')
+    parser.add_argument('--save', default=None, metavar='PATH', help='把本次的 ms/page 寫成 JSON')
+    parser.add_argument('--compare', default=None, metavar='PATH', help='與先前 --save 的結果比較 ms/page')
+    parser.add_argument('--max-slowdown', type=float, default=None,
+                        help='搭配 --compare：任一項目比先前慢超過此倍數即失敗，例如 1.2')
+    args = parser.parse_args()
+
+    parsing.configure(args.parser, args.targeted)
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)['ms_per_page']
+
+    label = args.parser + (' + targeted' if args.targeted else '')
+    print(f"Parser backend: {label}, best of {args.repeat}")
+    print(f"{'extractor':<16}{'size':<8}{'articles':>9}{'KB':>7}{'ms/page':>10}{'median':>9}{'vs prev':>9}  golden")
+    results = {}
+    mismatches = missing = slower = 0
+    for size in args.sizes:
+        for name, html_pages, extract in extractor_cases(SIZES[size]):
+            key = f"{name}/{size}"
+            timings, output = time_extractor(extract, html_pages, args.repeat)
+            best = min(timings)
+            results[key] = best
+
+            actual = serialize(output)
+            path = golden_path(name, size)
+            golden = read_golden(path)
+            if args.update:
+                write_golden(path, actual)
+                status = 'updated' if golden != actual else 'same'
+            elif golden is None:
+                missing += 1
+                status = 'MISSING'
+            elif golden == actual:
+                status = 'identical'
+            else:
+                mismatches += 1
+                status = 'DIFFERS'
+
+            change = ''
+            if key in previous:
+                ratio = best / previous[key]
+                change = f"{(ratio - 1) * 100:+.0f}%"
+                if args.max_slowdown and ratio > args.max_slowdown:
+                    slower += 1
+                    change += '!'
+            kb = sum(len(html.encode()) for html in html_pages) / 1024
+            print(f"{name:<16}{size:<8}{SIZES[size]:>9}{kb:>7.0f}{best:>10.2f}{statistics.median(timings):>9.2f}"
+                  f"{change:>9}  {status}")
+            if status == 'DIFFERS':
+                show_diff(golden, actual, os.path.relpath(path))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'parser': label, 'repeat': args.repeat, 'ms_per_page': results}, f, indent=2)
+        print(f"Saved timings to {args.save}")
+
+    failures = []
+    if mismatches:
+        failures.append(f"{mismatches} outputs differ from the golden files")
+    if missing:
+        failures.append(f"{missing} golden files missing (run with --update)")
+    if slower:
+        failures.append(f"{slower} extractors slower than {args.max_slowdown}x the previous run")
+    if failures:
+        raise SystemExit("; ".join(failures))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""在本機模擬六個法規網站，供基準測試使用，不必對政府網站送出請求
+
+依 Host 標頭與路徑回應與各網站相同網址結構的列表頁與法規頁（法規頁由 bench.pages 產生），
+可設定每個請求的延遲、延遲抖動與錯誤率（回應 503）。爬蟲設定環境變數
+LAWCRAWLER_HOST_OVERRIDE=http://127.0.0.1:<port> 後，所有請求都會送到這裡。
+
+    python -m bench.mock_server --port 8000 --laws 200 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import functools
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from bench import pages
+
+# 列表頁的每頁筆數，與各網站預設相同
+TAIPEI_PAGE_SIZE = 20
+TAICHUNG_PAGE_SIZE = 15
+ASPNET_PAGE_SIZE = 20
+# 中央法規每個分類、新北市每個類別的法規數
+CATEGORY_SIZE = 50
+
+
+def next_link_id(page_size):
+    """ASP.NET Repeater 的頁尾序號接在各列之後，「下一頁」連結的 id 因此隨每頁筆數改變"""
+    return f"ctl00_cp_content_rptList_ctl{page_size + 1:02d}_PagerButtom_hlNext"
+
+
+def _page(body):
+    return f'<!DOCTYPE html>\n<html lang="zh-Hant-TW"><head><meta charset="utf-8"></head><body>{body}</body></html>'
+
+
+class MockSites:
+    """產生六個網站的頁面；每個網站各有 laws 部法規，同樣的參數每次產生相同的內容"""
+
+    def __init__(self, laws=100, articles=30, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.laws = laws
+        self.articles = articles
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.routes = {
+            'law.moj.gov.tw': self.central,
+            'www.laws.taipei.gov.tw': self.taipei,
+            'law.taichung.gov.tw': self.taichung,
+            'web.law.ntpc.gov.tw': self.ntpc,
+            'law.tycg.gov.tw': functools.partial(self.aspnet, '桃園市', pages.taoyuan_law_page),
+            'outlaw.kcg.gov.tw': functools.partial(self.aspnet, '高雄市', self._kaohsiung_law_page),
+        }
+
+    def delay(self):
+        """回傳這個請求要等待的秒數，以及是否注入錯誤"""
+        with self._lock:
+            self.requests += 1
+            wait = self.latency + self._rng.uniform(0, self.jitter)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return wait, failed
+
+    def respond(self, host, target):
+        """回傳 (狀態碼, HTML)；未知的主機或路徑回應 404"""
+        route = self.routes.get(host.split(':')[0].lower())
+        parts = urlsplit(target)
+        body = route(parts.path, dict(parse_qsl(parts.query))) if route else None
+        return (200, body) if body is not None else (404, _page("Not Found"))
+
+    def _categories(self):
+        return range(1, -(-self.laws // CATEGORY_SIZE) + 1)
+
+    def _category_laws(self, category):
+        return range((category - 1) * CATEGORY_SIZE + 1, min(category * CATEGORY_SIZE, self.laws) + 1)
+
+    @functools.lru_cache(maxsize=4096)
+    def _law_page(self, site, n, factory):
+        return factory(f"{site}測試法規{n}", self.articles, seed=n)
+
+    def _kaohsiung_law_page(self, name, articles, seed=0):
+        # 部分法規沒有條文表格，需逐一解析 span
+        return pages.kaohsiung_law_page(name, articles, layout='spans' if seed % 7 == 0 else 'table', seed=seed)
+
+    def central(self, path, query):
+        """law.moj.gov.tw：分類樹、分類頁（每個分類另外列出第一部法規，模擬跨分類重複）、LawAll.aspx"""
+        if path == '/Law/LawSearchLaw.aspx' and 'TY' not in query:
+            items = "".join(
+                f'<li><a href="LawSearchLaw.aspx?TY=04{c:03d}">分類{c}</a>'
+                f'<span class="badge">{len(self._category_laws(c))}</span></li>'
+                for c in self._categories()
+            )
+            return _page(f'<ul id="tree"><li><a href="javascript:void(0)">行政</a><ul>{items}</ul></li></ul>')
+        if path == '/Law/LawSearchLaw.aspx':
+            category = int(query['TY'][2:])
+            rows = "".join(
+                f'<tr><td><a href="/LawClass/LawAll.aspx?PCODE=A{n:07d}">中央測試法規{n}</a></td></tr>'
+                for n in [1, *self._category_laws(category)]
+            )
+            return _page(f'<table class="table table-hover tab-list tab-central">{rows}</table>')
+        if path == '/LawClass/LawAll.aspx':
+            n = int(query.get('PCODE', query.get('pcode', 'A0'))[1:])
+            return self._law_page('中央', n, pages.central_law_page) if 1 <= n <= self.laws else None
+        return None
+
+    def taipei(self, path, query):
+        """www.laws.taipei.gov.tw：LawCategoryResult 分頁列表、LawInformation 與 LawArticleContent"""
+        if path == '/Law/LawCategory/LawCategoryResult':
+            total_pages = -(-self.laws // TAIPEI_PAGE_SIZE)
+            page = int(query.get('page', 1))
+            first = (page - 1) * TAIPEI_PAGE_SIZE + 1
+            rows = "".join(
+                f'<tr><td><a href="/Law/LawSearch/LawInformation/FL{n:06d}">臺北市測試法規{n}</a></td></tr>'
+                for n in range(first, min(first + TAIPEI_PAGE_SIZE, self.laws + 1))
+            )
+            return _page(f'<div class="paging-counts">第 <em>{page}</em> 頁，共 <em>{total_pages}</em> 頁</div>'
+                         f'<table class="table-tab">{rows}</table>')
+        for prefix in ('/Law/LawSearch/LawInformation/FL', '/Law/LawSearch/LawArticleContent/FL'):
+            if path.startswith(prefix):
+                n = int(path[len(prefix):])
+                if not 1 <= n <= self.laws:
+                    return None
+                if 'Information' in prefix:
+                    return pages.taipei_info_page(f"臺北市測試法規{n}", seed=n)
+                return pages.taipei_content_page(self.articles, points=n % 5 == 0, seed=n)
+        return None
+
+    def taichung(self, path, query):
+        """law.taichung.gov.tw：類別清單、類別分頁（分頁列只顯示附近的頁碼）、LawContent.aspx"""
+        if path == '/LawCategoryMain.aspx' and 'CategoryID' not in query:
+            links = "".join(f'<li><a href="LawCategoryMain.aspx?CategoryID={c}">類別{c}</a></li>'
+                            for c in self._categories())
+            return _page(f'<ul class="category">{links}</ul>')
+        if path == '/LawCategoryMain.aspx':
+            laws = self._category_laws(int(query['CategoryID']))
+            total_pages = -(-len(laws) // TAICHUNG_PAGE_SIZE)
+            page = int(query.get('page', 1))
+            rows = "".join(
+                f'<tr><td><a href="LawContent.aspx?id={n}">臺中市測試法規{n}</a></td></tr>'
+                for n in laws[(page - 1) * TAICHUNG_PAGE_SIZE:page * TAICHUNG_PAGE_SIZE]
+            )
+            pager = "".join(f'<a href="LawCategoryMain.aspx?CategoryID={query["CategoryID"]}&page={p}">{p}</a>'
+                            for p in range(max(1, page - 2), min(total_pages, page + 2) + 1))
+            return _page(f'<table class="table table-hover">{rows}</table><div class="pager">{pager}</div>')
+        if path == '/LawContent.aspx':
+            n = int(query.get('id', 0))
+            return self._law_page('臺中市', n, pages.taichung_law_page) if 1 <= n <= self.laws else None
+        return None
+
+    def ntpc(self, path, query):
+        """web.law.ntpc.gov.tw：Level.aspx、Query2.aspx 類別頁、FLAWDAT0202 / FLAWDAT0201
+
+        每四部法規有一部的內容只在 FLAWDAT0201，另一個端點回應沒有條文表格的頁面。
+        """
+        if path == '/Level.aspx':
+            links = "".join(f'<li><a href="Query2.aspx?no=C{c:02d}">類別{c}</a></li>' for c in self._categories())
+            return _page(f'<ul class="level">{links}</ul>')
+        if path == '/Query2.aspx':
+            rows = "".join(
+                f'<tr><td><a href="FLAWDAT01.aspx?lncode=1C{n:06d}">新北市測試法規{n}</a></td></tr>'
+                for n in self._category_laws(int(query['no'][1:]))
+            )
+            return _page(f'<table class="tab-list">{rows}</table>')
+        if path in ('/Scripts/FLAWDAT0202.aspx', '/Scripts/FLAWDAT0201.aspx'):
+            n = int(query.get('fcode', 'C0')[1:])
+            if not 1 <= n <= self.laws:
+                return None
+            if (n % 4 == 3) != path.endswith('0201.aspx'):
+                return _page('<div class="nodata">查無資料</div>')
+            table_class = 'tab-law' if n % 4 == 3 else 'tab-law01'
+            return pages.ntpc_law_page(f"新北市測試法規{n}", self.articles, table_class=table_class, seed=n)
+        return None
+
+    def aspnet(self, site, law_page, path, query):
+        """law.tycg.gov.tw、outlaw.kcg.gov.tw：LawResultList.aspx（總筆數與下一頁連結）、LawContent.aspx
+
+        列表頁支援 PageSize 參數；每 25 筆有一筆標示為已廢止。
+        """
+        if path == '/LawResultList.aspx':
+            size = int(query.get('PageSize', ASPNET_PAGE_SIZE))
+            page = int(query.get('page', 1))
+            first = (page - 1) * size + 1
+            rows = "".join(
+                f'<tr><td><a href="LawContent.aspx?id={n}">{site}測試法規{n}</a>'
+                f'{"<span class=label-fei>廢</span>" if n % 25 == 0 else ""}</td><td>2023-08-{n % 28 + 1:02d}</td></tr>'
+                for n in range(first, min(first + size, self.laws + 1))
+            )
+            pager = ""
+            if first + size <= self.laws:
+                pager = f'<a id="{next_link_id(size)}" href="LawResultList.aspx?{urlencode(dict(query, page=page + 1))}">下一頁</a>'
+            return _page(f'<div class="pageinfo">共 {self.laws} 筆</div>'
+                         f'<table class="table table-hover">{rows}</table>{pager}')
+        if path == '/LawContent.aspx':
+            n = int(query.get('id', 0))
+            return self._law_page(site, n, law_page) if 1 <= n <= self.laws else None
+        return None
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    sites = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, include_body):
+        wait, failed = self.sites.delay()
+        if wait:
+            time.sleep(wait)
+        status, body = (503, _page("Service Unavailable")) if failed else self.sites.respond(
+            self.headers.get('Host', ''), self.path)
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if include_body:
+            self.wfile.write(data)
+
+    def do_GET(self):
+        self._reply(True)
+
+    def do_HEAD(self):
+        self._reply(False)
+
+
+def start(sites, host='127.0.0.1', port=0):
+    """在背景執行緒啟動模擬伺服器，回傳 (server, 基底網址)；port 為 0 時自動選擇"""
+    handler = type('Handler', (MockHandler,), {'sites': sites})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='mock-server', daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def add_arguments(parser):
+    parser.add_argument('--laws', type=int, default=100, help='每個網站的法規數')
+    parser.add_argument('--articles', type=int, default=30, help='每部法規的條文數')
+    parser.add_argument('--latency', type=float, default=0.0, help='每個請求的固定延遲（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='額外的隨機延遲上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='回應 503 的比例')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def sites_from_args(args):
+    return MockSites(args.laws, args.articles, args.latency, args.jitter, args.error_rate, args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="模擬六個法規網站的本機 HTTP 伺服器")
+    parser.add_argument('--port', type=int, default=8000)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    server, url = start(sites_from_args(args), port=args.port)
+    print(f"Serving mock law sites on {url}; crawl with LAWCRAWLER_HOST_OVERRIDE={url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""產生與各網站結構相同的法規頁面，供解析基準測試與模擬伺服器使用
+
+頁面只重現爬蟲實際用到的結構（選擇器、欄位順序），外加一般政府網站常見的
+導覽列、腳本與頁尾，讓解析成本接近真實頁面。內容以 seed 決定，每次產生結果一致。
+"""
+import json
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+CLAUSES = [
+    "本法依地方制度法規定制定之", "主管機關應定期檢討並公告之", "前項規定之申請程序及應備文件",
+    "由主管機關另定之", "違反第一項規定者，處新臺幣三萬元以上十五萬元以下罰鍰", "並得按次處罰",
+    "直轄市政府得委託所屬機關辦理", "本辦法所稱之用詞，定義如下", "經審查合格者，發給許可證",
+    "有下列情形之一者，不予許可", "申請人應於期限內補正", "屆期未補正者，駁回其申請",
+    "其收費基準由主管機關定之", "必要時得會同相關機關辦理", "本法自公布日施行",
+]
+CHINESE_NUMERALS = "一二三四五六七八九十"
+
+
+def _text(rng, clauses=3):
+    return "，".join(rng.choice(CLAUSES) for _ in range(clauses)) + "。"
+
+
+def _numeral(n):
+    """1 到 99 的中文數字"""
+    if n <= 10:
+        return CHINESE_NUMERALS[n - 1]
+    tens, ones = divmod(n, 10)
+    prefix = "" if tens == 1 else CHINESE_NUMERALS[tens - 1]
+    return prefix + "十" + (CHINESE_NUMERALS[ones - 1] if ones else "")
+
+
+def _layout(title, body, rng):
+    """加上政府網站常見的頁首、導覽選單、腳本與頁尾"""
+    menu = "".join(
+        f'<li class="nav-item"><a class="nav-link" href="/Menu.aspx?id={i}">選單項目{i}</a>'
+        f'<ul class="sub">{"".join(f"<li><a href=/Sub.aspx?id={i}_{j}>子項目{j}</a></li>" for j in range(6))}</ul></li>'
+        for i in range(12)
+    )
+    script = "<script>var config = {" + ",".join(f'"k{i}": {rng.randint(0, 9999)}' for i in range(80)) + "};</script>"
+    footer = "".join(f'<p class="footer-text">{_text(rng, 2)}</p>' for _ in range(6))
+    return (
+        '<!DOCTYPE html>\n<html lang="zh-Hant-TW"><head><meta charset="utf-8">'
+        f'<title>{title}</title><link rel="stylesheet" href="/css/site.css">{script}</head>\n'
+        f'<body><header class="header"><div class="container"><ul class="nav">{menu}</ul></div></header>\n'
+        f'<div id="main" class="container">{body}</div>\n'
+        f'<footer class="footer"><div class="container">{footer}</div></footer></body></html>'
+    )
+
+
+def central_law_page(name, articles, seed=0):
+    """law.moj.gov.tw LawAll.aspx"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(1, articles + 1):
+        if i % 25 == 1:
+            rows.append(f'<div class="h3 char-2">第 {_numeral(i // 25 + 1)} 章 總則</div>')
+        lines = "".join(f'<div class="line-0000">{_text(rng)}</div>' for _ in range(rng.randint(1, 3)))
+        rows.append(
+            f'<div class="row"><div class="col-no"><a name="{i}" href="LawSingle.aspx?pcode=A0000001&flno={i}">'
+            f'第 {i} 條</a></div><div class="col-data"><div class="law-article">{lines}</div></div></div>'
+        )
+    body = (
+        '<div class="law-result"><table class="table">'
+        f'<tr><th>法規名稱：</th><td><a id="hlLawName" href="LawAll.aspx?pcode=A0000001">{name}</a></td></tr>'
+        '<tr id="trLNNDate"><th>修正日期：</th><td>民國 112 年 06 月 28 日</td></tr>'
+        '<tr><th>法規類別：</th><td>行政＞內政部＞民政目</td></tr>'
+        '</table></div>'
+        f'<div class="law-reg-content">{"".join(rows)}</div>'
+    )
+    return _layout(name, body, rng)
+
+
+def taipei_info_page(name, seed=0):
+    """www.laws.taipei.gov.tw LawInformation/FL..."""
+    rng = random.Random(seed)
+    body = (
+        '<div class="law-information">'
+        f'<div class="row"><div class="col-label">法規名稱</div><div class="col-input"><a class="law-link" href="#">{name}</a></div></div>'
+        '<div class="row"><div class="col-label">公發布日</div><div class="col-input"><dfn>民國 100 年 01 月 01 日</dfn></div></div>'
+        '<div class="row"><div class="col-label">修正日期</div><div class="col-input"><dfn>民國 112 年 03 月 15 日</dfn></div></div>'
+        '<div class="row"><div class="col-label">法規體系</div><div class="col-input">臺北市法規</div></div>'
+        '</div>'
+    )
+    return _layout(name, body, rng)
+
+
+def taipei_content_page(articles, points=False, seed=0):
+    """www.laws.taipei.gov.tw LawArticleContent/FL...；points 為 True 時以「一、」編號"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(1, articles + 1):
+        if i % 20 == 1:
+            items.append(f'<li><div class="law-chapter">第{_numeral(i // 20 + 1)}章 通則</div></li>')
+        if points:
+            items.append(f'<li><div class="law-articlepre">{_numeral(min(i, 99))}、{_text(rng)}</div></li>')
+        else:
+            items.append(f'<li><div class="col-no">第{i}條</div><div class="law-articlepre">{_text(rng)}</div></li>')
+    body = f'<div class="law-content-wrap"><ul class="law law-content">{"".join(items)}</ul></div>'
+    return _layout("法規條文", body, rng)
+
+
+def taichung_law_page(name, articles, seed=0):
+    """law.taichung.gov.tw LawContent.aspx"""
+    rng = random.Random(seed)
+    rows = "".join(
+        f'<tr><td class="col-no">第 {i} 條</td><td><pre>{_text(rng)}</pre></td></tr>'
+        for i in range(1, articles + 1)
+    )
+    body = (
+        '<table class="table table-bordered">'
+        f'<tr><th>法規名稱</th><td>{name}</td></tr>'
+        '<tr><th>公發布日</th><td>民國 108 年 05 月 20 日</td></tr>'
+        '<tr><th>法規體系</th><td>臺中市法規＞經濟發展局</td></tr>'
+        '</table>'
+        f'<table class="table tab-law">{rows}</table>'
+    )
+    return _layout(name, body, rng)
+
+
+def ntpc_law_page(name, articles, table_class='tab-law01', seed=0):
+    """web.law.ntpc.gov.tw Scripts/FLAWDAT0202.aspx 或 FLAWDAT0201.aspx"""
+    rng = random.Random(seed)
+    rows = "".join(
+        f'<tr><td class="col-th">第 {i} 條</td><td class="col-td"><pre>{_text(rng)}</pre></td></tr>'
+        for i in range(1, articles + 1)
+    )
+    body = (
+        f'<div id="cph_content_lawheader_law">{name}(民國 111 年 12 月 30 日 修正)</div>'
+        f'<table class="{table_class}">{rows}</table>'
+    )
+    return _layout(name, body, rng)
+
+
+def _aspnet_info_table(name, rng):
+    return (
+        '<table class="table table-bordered">'
+        f'<tr><th>法規名稱</th><td>{name}</td></tr>'
+        '<tr><th>公發布日</th><td>民國 105 年 02 月 03 日</td></tr>'
+        '<tr><th>修正日期</th><td>民國 112 年 08 月 09 日</td></tr>'
+        '<tr><th>發文字號</th><td>府法規字第1120000000號</td></tr>'
+        '<tr><th>法規體系</th><td>地方法規＞自治條例</td></tr>'
+        '</table>'
+    )
+
+
+def taoyuan_law_page(name, articles, seed=0):
+    """law.tycg.gov.tw LawContent.aspx"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(1, articles + 1):
+        if i % 15 == 1:
+            rows.append(f'<tr><td colspan="2">第{_numeral(i // 15 + 1)}章 總則</td></tr>')
+        rows.append(f'<tr><td>第 {i} 條</td><td>{_text(rng)}</td></tr>')
+    body = _aspnet_info_table(name, rng) + f'<table class="table tab-law">{"".join(rows)}</table>'
+    return _layout(name, body, rng)
+
+
+def kaohsiung_law_page(name, articles, layout='table', seed=0):
+    """outlaw.kcg.gov.tw LawContent.aspx；layout='spans' 產生沒有條文表格、需逐一解析 span 的版本"""
+    rng = random.Random(seed)
+    if layout == 'table':
+        rows = []
+        for i in range(1, articles + 1):
+            if i % 15 == 1:
+                rows.append(f'<tr><td colspan="2">第{_numeral(i // 15 + 1)}章 總則</td></tr>')
+            rows.append(f'<tr><td>第 {i} 條</td><td>{_text(rng)}</td></tr>')
+        content = f'<table class="table tab-law">{"".join(rows)}</table>'
+    else:
+        spans = []
+        for i in range(1, articles + 1):
+            spans.append(f'<p><span>第{_numeral(min(i, 99))}條　{_text(rng, 2)}</span></p>')
+            for _ in range(rng.randint(0, 2)):
+                spans.append(f'<p><span>{_text(rng, 2)}</span></p>')
+        content = f'<div id="divLawContent08" class="law-reg-content law-article">{"".join(spans)}</div>'
+    return _layout(name, _aspnet_info_table(name, rng) + content, rng)
+
+
+def central_bulk_laws(laws, articles=30, seed=0):
+    """全國法規資料庫整批下載（ChLaw.json）格式的法規；每十部有一部標示為已廢止，
+    每二十部有一部沒有法規網址，確認去除重複不會把這些法規合併"""
+    rng = random.Random(seed)
+    records = []
+    for n in range(1, laws + 1):
+        items = []
+        for i in range(1, articles + 1):
+            if i % 25 == 1:
+                items.append({"ArticleType": "C", "ArticleNo": "", "ArticleContent": f"第 {_numeral(i // 25 + 1)} 章 總則"})
+            items.append({"ArticleType": "A", "ArticleNo": f"第 {i} 條", "ArticleContent": _text(rng)})
+        records.append({
+            "LawLevel": "命令",
+            "LawName": f"測試法規{n}",
+            "LawURL": f"https://law.moj.gov.tw/LawClass/LawAll.aspx?pcode=A{n:07d}" if n % 20 != 7 else "",
+            "LawCategory": "行政＞內政部＞民政目",
+            "LawModifiedDate": "20230628",
+            "LawAbandonNote": "廢" if n % 10 == 0 else "",
+            "LawHistories": "中華民國一百十二年六月二十八日修正發布",
+            "LawArticles": items,
+        })
+    return records
+
+
+def central_bulk_archive(path, laws, articles=30, fmt='json', seed=0):
+    """寫出與整批下載相同結構的 zip（ChLaw.json 或 ChLaw.xml），供 --bulk 以本機檔案測試"""
+    records = central_bulk_laws(laws, articles, seed)
+    if fmt == 'json':
+        name = 'ChLaw.json'
+        data = json.dumps({"UpdateDate": "2023/6/30", "Laws": records}, ensure_ascii=False, indent=1)
+        data = '\ufeff' + data
+    else:
+        name = 'ChLaw.xml'
+        laws_xml = []
+        for record in records:
+            content = "".join(
+                f"<條文><條號>{item['ArticleNo']}</條號><條文內容>{escape(item['ArticleContent'])}</條文內容></條文>"
+                if item['ArticleType'] == 'A' else f"<編章節>{item['ArticleContent']}</編章節>"
+                for item in record['LawArticles']
+            )
+            laws_xml.append(
+                f"<法規><法規性質>{record['LawLevel']}</法規性質><法規名稱>{record['LawName']}</法規名稱>"
+                f"<法規網址>{escape(record['LawURL'])}</法規網址><法規類別>{record['LawCategory']}</法規類別>"
+                f"<最新異動日期>{record['LawModifiedDate']}</最新異動日期><廢止註記>{record['LawAbandonNote']}</廢止註記>"
+                f"<沿革內容>{record['LawHistories']}</沿革內容><法規內容>{content}</法規內容></法規>"
+            )
+        data = f'<?xml version="1.0" encoding="utf-8"?>\n<LAWS><UpdateDate>2023/6/30</UpdateDate>{"".join(laws_xml)}</LAWS>'
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(name, data.encode('utf-8'))
+    return path
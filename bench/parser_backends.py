@@ -0,0 +1,106 @@
+"""比較各解析後端（html.parser / lxml，完整建樹 / 只解析需要的子樹）的速度
+
+每個網站的解析函式都在所有後端上執行，並確認輸出與原本的 html.parser 完整解析完全相同。
+
+    python -m bench.parser_backends --articles 300 --repeat 5
+"""
+import argparse
+import importlib
+import json
+import logging
+import time
+
+# 先設定日誌，匯入爬蟲時其 basicConfig 便不再生效，基準測試輸出不會混入爬蟲日誌
+logging.basicConfig(level=logging.WARNING)
+
+from bench import pages  # noqa: E402
+from lawcrawler import parsing  # noqa: E402
+
+BACKENDS = [
+    ('html.parser', False),
+    ('html.parser', True),
+    ('lxml', False),
+    ('lxml', True),
+]
+
+
+def site_cases(articles):
+    """回傳 (名稱, HTML, 解析函式)；解析函式接受 HTML 並回傳可序列化的結果"""
+    central = importlib.import_module('中央法規')
+    taipei = importlib.import_module('台北市法規')
+    taichung = importlib.import_module('台中市法規')
+    ntpc = importlib.import_module('新北市法規')
+    taoyuan = importlib.import_module('桃園市法規')
+    kaohsiung = importlib.import_module('高雄市法規')
+
+    law_info = {'name': '測試自治條例', 'url': 'https://example.gov.tw/LawContent.aspx?id=1', 'date': '2023-08-09'}
+    return [
+        ('central', pages.central_law_page('測試法', articles),
+         lambda html: central.parse_law_json(html, 'https://law.moj.gov.tw/LawClass/LawAll.aspx?PCODE=A0000001')),
+        ('taipei-info', pages.taipei_info_page('臺北市測試自治條例'),
+         lambda html: taipei.parse_law_info(html, 'https://www.laws.taipei.gov.tw/Law/LawSearch/LawArticleContent/FL000001')),
+        ('taipei-content', pages.taipei_content_page(articles),
+         lambda html: taipei.parse_law_articles(html, {'LawArticles': []})),
+        ('taichung', pages.taichung_law_page('臺中市測試自治條例', articles),
+         lambda html: taichung.parse_law_content(html, 'https://law.taichung.gov.tw/LawContent.aspx?id=1')),
+        ('ntpc', pages.ntpc_law_page('新北市測試自治條例', articles),
+         lambda html: ntpc.parse_law_content(html, {'title': '新北市測試自治條例', 'fcode': 'C000001'})),
+        ('taoyuan', pages.taoyuan_law_page('桃園市測試自治條例', articles),
+         lambda html: taoyuan.parse_law_content(html, law_info)),
+        ('kaohsiung', pages.kaohsiung_law_page('高雄市測試自治條例', articles),
+         lambda html: kaohsiung.parse_law_content(html, law_info)),
+        ('kaohsiung-spans', pages.kaohsiung_law_page('高雄市測試自治條例', articles, layout='spans'),
+         lambda html: kaohsiung.parse_law_content(html, law_info)),
+    ]
+
+
+def lxml_available():
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def time_parse(parse, html, repeat):
+    """回傳 (最佳單次毫秒數, 輸出)"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = parse(html)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較各網站解析函式在不同解析後端的速度")
+    parser.add_argument('--articles', type=int, default=300, help='每部法規的條文數')
+    parser.add_argument('--repeat', type=int, default=5, help='每個組合重複次數，取最佳值')
+    args = parser.parse_args()
+
+    backends = [b for b in BACKENDS if b[0] != 'lxml' or lxml_available()]
+    if len(backends) < len(BACKENDS):
+        print("lxml is not installed; skipping lxml backends")
+
+    print(f"{'site':<16}{'backend':<24}{'KB':>7}{'ms/page':>10}{'speedup':>9}  identical")
+    mismatches = 0
+    for name, html, parse in site_cases(args.articles):
+        baseline_ms = baseline = None
+        for features, targeted in backends:
+            parsing.configure(features, targeted)
+            ms, output = time_parse(parse, html, args.repeat)
+            if baseline is None:
+                baseline_ms, baseline = ms, json.dumps(output, ensure_ascii=False)
+            identical = json.dumps(output, ensure_ascii=False) == baseline
+            mismatches += not identical
+            label = features + (' + targeted' if targeted else '')
+            print(f"{name:<16}{label:<24}{len(html.encode()) / 1024:>7.0f}{ms:>10.2f}"
+                  f"{baseline_ms / ms:>8.2f}x  {'yes' if identical else 'NO'}")
+    parsing.configure('html.parser', False)
+
+    if mismatches:
+        raise SystemExit(f"{mismatches} backend outputs differ from html.parser")
+
+
+if __name__ == '__main__':
+    main()
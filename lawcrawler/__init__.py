@@ -0,0 +1 @@
+"""各法規爬蟲共用的抓取、排程與統計模組"""
@@ -0,0 +1,156 @@
+import gzip
+import logging
+import os
+import sqlite3
+import threading
+import time
+from email.utils import formatdate
+
+from requests.exceptions import ConnectionError
+
+from .cache import STORED_HEADERS, build_response
+
+try:
+    import zstandard
+except ImportError:  # zstandard 為選用套件，沒有時改用 gzip
+    zstandard = None
+
+
+class Archive:
+    """只附加寫入的原始回應封存檔（仿 WARC），以網址建立索引
+
+    每個回應寫成一筆獨立壓縮的紀錄（WARC 風格的標頭加上原始內容），依序附加在
+    分段檔 archive-NNNNN.warc.zst（沒有 zstandard 時為 .warc.gz）之後；分段檔超過
+    max_segment_bytes 時開新檔。index.sqlite 記錄每個網址最新一筆紀錄的位置，
+    讀取時只需 seek 後解壓縮單筆紀錄。
+    """
+
+    def __init__(self, directory, max_segment_bytes=1024 ** 3):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.suffix = '.warc.zst' if zstandard else '.warc.gz'
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self._index.execute("PRAGMA journal_mode=WAL")
+        with self._index:
+            self._index.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    url TEXT PRIMARY KEY,
+                    segment TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    status INTEGER,
+                    fetched_at REAL
+                )""")
+        self._segment = None
+        self._file = None
+
+    def _compress(self, data):
+        if zstandard:
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data)
+
+    @staticmethod
+    def _decompress(segment, data):
+        if segment.endswith('.zst'):
+            if zstandard is None:
+                raise RuntimeError(f"{segment} is zstd-compressed: pip install zstandard")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _open_segment(self):
+        """沿用最後一個未滿的分段檔，否則建立新檔"""
+        segments = sorted(name for name in os.listdir(self.directory) if name.endswith(self.suffix))
+        if segments and os.path.getsize(os.path.join(self.directory, segments[-1])) < self.max_segment_bytes:
+            self._segment = segments[-1]
+        else:
+            self._segment = f"archive-{len(segments) + 1:05d}{self.suffix}"
+        self._file = open(os.path.join(self.directory, self._segment), 'ab')
+
+    def contains(self, url):
+        with self._lock:
+            return self._index.execute("SELECT 1 FROM records WHERE url = ?", (url,)).fetchone() is not None
+
+    def store(self, url, response):
+        """封存一個回應；同一網址再次封存時索引指向最新一筆"""
+        headers = [
+            "WARC/1.0",
+            "WARC-Type: response",
+            f"WARC-Target-URI: {url}",
+            f"WARC-Date: {formatdate(usegmt=True)}",
+            f"X-Status: {response.status_code}",
+        ] + [f"{h}: {response.headers[h]}" for h in STORED_HEADERS if h in response.headers]
+        body = response.content
+        headers.append(f"Content-Length: {len(body)}")
+        record = self._compress("\r\n".join(headers).encode('utf-8') + b"\r\n\r\n" + body + b"\r\n\r\n")
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.max_segment_bytes:
+                if self._file:
+                    self._file.close()
+                self._open_segment()
+            offset = self._file.seek(0, os.SEEK_END)
+            self._file.write(record)
+            self._file.flush()
+            with self._index:
+                self._index.execute(
+                    "INSERT OR REPLACE INTO records (url, segment, offset, length, status, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, self._segment, offset, len(record), response.status_code, time.time()))
+
+    def lookup(self, url):
+        """回傳與回應快取相同格式的 (meta, body)；沒有封存時回傳 None"""
+        with self._lock:
+            row = self._index.execute(
+                "SELECT segment, offset, length FROM records WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        segment, offset, length = row
+        with open(os.path.join(self.directory, segment), 'rb') as f:
+            f.seek(offset)
+            record = self._decompress(segment, f.read(length))
+        head, _, rest = record.partition(b"\r\n\r\n")
+        fields = dict(line.split(": ", 1) for line in head.decode('utf-8').split("\r\n")[1:])
+        body = rest[:int(fields['Content-Length'])]
+        meta = {
+            'url': fields['WARC-Target-URI'],
+            'status': int(fields['X-Status']),
+            'headers': {h: fields[h] for h in STORED_HEADERS if h in fields},
+        }
+        return meta, body
+
+    def response(self, request):
+        """離線模式：以封存內容回應請求，沒有封存的網址視為連線失敗"""
+        archived = self.lookup(request.url)
+        if archived is None:
+            raise ConnectionError(f"{request.url} is not in the archive {self.directory}", request=request)
+        meta, body = archived
+        return build_response(request, meta, b"" if request.method == 'HEAD' else body, 'ARCHIVE')
+
+    def count(self):
+        with self._lock:
+            return self._index.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+            self._index.close()
+
+
+# record：爬取時寫入的封存；offline：--reparse 時作為唯一資料來源（不連網）
+settings = {'record': None, 'offline': None}
+
+
+def enable(directory, **kwargs):
+    """爬取時把所有成功的回應寫入封存"""
+    settings['record'] = Archive(directory, **kwargs)
+    return settings['record']
+
+
+def enable_offline(directory):
+    """重新解析模式：所有請求都由封存回應，不發出任何網路請求"""
+    settings['offline'] = Archive(directory)
+    logging.info(f"Re-parsing offline from {directory} ({settings['offline'].count()} archived responses)")
+    return settings['offline']
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from urllib.parse import urlsplit
+
+from tqdm import tqdm
+
+from . import metrics
+from . import parsing
+from . import session
+from .ratelimit import default_limiter
+from .stats import Throughput
+
+try:
+    import httpx
+except ImportError:  # httpx 為選用套件，只有 async 引擎需要
+    httpx = None
+else:
+    # httpx 會對每個請求輸出 INFO 日誌，爬取量大時過於冗長
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+_END = object()
+
+
+class AsyncFetcher:
+    """以 httpx.AsyncClient 為基礎的非同步抓取器，單一執行緒即可維持大量在途請求"""
+
+    def __init__(self, headers=None, concurrency=100, timeout=30, retries=3,
+                 backoff_factor=0.5, status_forcelist=(500, 502, 503, 504), limiter=default_limiter, http2=None):
+        if httpx is None:
+            raise RuntimeError("The async engine requires httpx: pip install httpx")
+        self.headers = headers or {}
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = set(status_forcelist)
+        self.limiter = limiter
+        self.http2 = session.settings['http2'] if http2 is None else http2
+        self._client = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.concurrency,
+                              max_keepalive_connections=self.concurrency)
+        self._client = httpx.AsyncClient(headers=self.headers, timeout=self.timeout,
+                                         limits=limits, follow_redirects=True, http2=self.http2)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    async def get(self, url, timeout=None):
+        """發送 GET 請求，遇到 5xx 或連線錯誤時以指數退避重試"""
+        hostname = urlsplit(url).hostname
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                if self.limiter is not None:
+                    await self.limiter.acquire_async(url)
+                target, host = session.redirect(url)
+                try:
+                    # 以串流模式送出，收到標頭（ttfb）與讀完內容（download）分開量測；連線時間含在 ttfb 中
+                    request = self._client.build_request('GET', target, headers={'Host': host} if host else None,
+                                                         timeout=timeout or self.timeout)
+                    started = time.monotonic()
+                    response = await self._client.send(request, stream=True)
+                    received = time.monotonic()
+                    await response.aread()
+                    metrics.record_response(hostname, started, received, response.status_code, len(response.content))
+                    if response.status_code not in self.status_forcelist or attempt == self.retries:
+                        return response
+                    metrics.increment('retries_total', host=hostname)
+                except httpx.TransportError as e:
+                    metrics.increment('request_errors_total', host=hostname, reason=type(e).__name__)
+                    if attempt == self.retries:
+                        raise
+                await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    async def get_text(self, url, timeout=None):
+        response = await self.get(url, timeout=timeout)
+        return response.text
+
+    async def get_many_text(self, urls, timeout=None):
+        """同時抓取同一個項目需要的多個頁面，依 urls 的順序回傳內容"""
+        return await asyncio.gather(*(self.get_text(url, timeout=timeout) for url in urls))
+
+    async def parse(self, fn, *args):
+        """在背景執行緒（或啟用時的解析行程池）執行解析函式，避免阻塞事件迴圈"""
+        executor = parsing.pool()
+        with metrics.timer('parse'):
+            if executor is None:
+                return await asyncio.to_thread(fn, *args)
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+def run_async(items, handler, on_result, headers=None, concurrency=100, total=None, desc="Processing Laws"):
+    """以 async 引擎處理所有項目
+
+    handler(item, fetcher) 為 coroutine，回傳法規資料或 None；
+    on_result(item, law_data) 在事件迴圈中同步呼叫（例如存檔）。
+    items 可以是邊探索邊產出的 generator：下一個項目在背景執行緒中取得，
+    探索時的同步請求不會阻塞事件迴圈，未取用的項目也不會先堆在記憶體中。
+    """
+    stats = Throughput()
+    streaming = not isinstance(items, (list, tuple))
+
+    async def next_item(iterator, lock):
+        if not streaming:
+            return next(iterator, _END)
+        # generator 不能同時在多個執行緒中推進
+        async with lock:
+            return await asyncio.to_thread(next, iterator, _END)
+
+    async def worker(iterator, lock, fetcher, pbar):
+        while (item := await next_item(iterator, lock)) is not _END:
+            try:
+                law_data = await handler(item, fetcher)
+            except Exception as e:
+                logging.error(f"Error processing {item}: {e}")
+                law_data = None
+            if law_data:
+                on_result(item, law_data)
+            stats.record(bool(law_data))
+            pbar.update(1)
+
+    async def crawl():
+        iterator = iter(items)
+        lock = asyncio.Lock()
+        async with AsyncFetcher(headers=headers, concurrency=concurrency) as fetcher:
+            with tqdm(total=total, desc=desc) as pbar:
+                await asyncio.gather(*(worker(iterator, lock, fetcher, pbar) for _ in range(concurrency)))
+
+    asyncio.run(crawl())
+    stats.log_summary("async")
+    return stats
@@ -0,0 +1,96 @@
+"""串流讀取整批下載的開放資料壓縮檔（zip 內的 JSON 或 XML），記憶體用量只與單筆資料有關"""
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import xml.etree.ElementTree as ElementTree
+import zipfile
+
+import requests
+
+# 每次從壓縮檔讀取的字元數
+CHUNK_SIZE = 1 << 16
+
+
+def open_archive(path_or_url, headers=None, timeout=60):
+    """開啟本機或網路上的 zip 壓縮檔；網址先以串流下載到暫存檔，不經過回應快取與封存"""
+    if os.path.exists(path_or_url):
+        return zipfile.ZipFile(path_or_url)
+    logging.info(f"Downloading bulk archive {path_or_url}")
+    tmp = tempfile.TemporaryFile()
+    with requests.get(path_or_url, headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        shutil.copyfileobj(response.raw, tmp, CHUNK_SIZE)
+    logging.info(f"Downloaded {tmp.tell() / 1024 ** 2:.1f} MB from {path_or_url}")
+    tmp.seek(0)
+    return zipfile.ZipFile(tmp)
+
+
+def iter_json_array(stream, key):
+    """逐筆產生 JSON 文件中 key 陣列的元素，不需先讀入整份文件
+
+    緩衝區只保留尚未解析完的部分，最多約為一筆元素加上一個讀取區塊。
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = -1
+    # 先找到 "key": [ 的位置
+    marker = f'"{key}"'
+    while pos < 0:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            raise ValueError(f"No {key!r} array in JSON document")
+        buffer += chunk
+        pos = buffer.find(marker)
+    buffer = buffer[pos + len(marker):]
+    while '[' not in buffer:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            raise ValueError(f"{key!r} is not an array")
+        buffer += chunk
+    buffer = buffer[buffer.index('[') + 1:]
+
+    eof = False
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except ValueError:
+            # 元素還沒讀完整，再讀一個區塊
+            if eof:
+                raise
+            chunk = stream.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def iter_xml_elements(stream, tag):
+    """逐一產生 XML 文件中的 tag 元素（根元素的直接子元素），處理完即從樹上移除以維持固定的記憶體用量"""
+    root = None
+    for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+        if root is None:
+            root = element
+        if event == 'end' and element.tag == tag:
+            yield element
+            root.remove(element)
+
+
+def iter_archive(archive, json_key=None, xml_tag=None):
+    """逐筆產生壓縮檔內所有 .json 與 .xml 檔的資料：JSON 為 dict，XML 為 Element"""
+    for member in archive.namelist():
+        lower = member.lower()
+        if lower.endswith('.json') and json_key:
+            logging.info(f"Streaming {member}")
+            with io.TextIOWrapper(archive.open(member), encoding='utf-8-sig') as stream:
+                yield from iter_json_array(stream, json_key)
+        elif lower.endswith('.xml') and xml_tag:
+            logging.info(f"Streaming {member}")
+            with archive.open(member) as stream:
+                yield from iter_xml_elements(stream, xml_tag)
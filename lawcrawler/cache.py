@@ -0,0 +1,156 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# 列表頁（分類、分頁結果）在 TTL 內直接使用快取，不再向伺服器確認
+LISTING_PATTERNS = [
+    re.compile(p) for p in (
+        r'LawSearchLaw\.aspx',
+        r'LawCategoryResult',
+        r'LawCategoryMain\.aspx',
+        r'Level\.aspx',
+        r'Query2\.aspx',
+        r'LawResultList\.aspx',
+    )
+]
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Date')
+
+
+class ResponseCache:
+    """保存回應內容與驗證資訊（ETag / Last-Modified）的磁碟快取
+
+    法規頁每次都以條件式 GET 向伺服器確認，收到 304 時直接使用磁碟上的內容；
+    列表頁在 listing_ttl 秒內視為新鮮。總大小超過 max_bytes 時淘汰最久未使用的項目。
+    """
+
+    def __init__(self, directory='.http_cache', max_bytes=2 * 1024 ** 3, listing_ttl=6 * 3600,
+                 listing_patterns=LISTING_PATTERNS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.listing_ttl = listing_ttl
+        self.listing_patterns = listing_patterns
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(os.path.getsize(path) for path in self._files())
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                yield os.path.join(root, name)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return base + '.json', base + '.body'
+
+    def is_listing(self, url):
+        return any(p.search(url) for p in self.listing_patterns)
+
+    def lookup(self, url):
+        """回傳 (meta, body)；沒有快取時回傳 None"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return meta, body
+
+    def is_fresh(self, url, meta):
+        return self.is_listing(url) and time.time() - meta['stored_at'] < self.listing_ttl
+
+    def validators(self, meta):
+        """條件式 GET 需要附加的標頭"""
+        headers = {}
+        if meta['headers'].get('ETag'):
+            headers['If-None-Match'] = meta['headers']['ETag']
+        if meta['headers'].get('Last-Modified'):
+            headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+        return headers
+
+    def touch(self, url):
+        for path in self._paths(url):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    def store(self, url, response):
+        meta_path, body_path = self._paths(url)
+        meta = {
+            'url': response.url,
+            'status': response.status_code,
+            'stored_at': time.time(),
+            'headers': {h: response.headers[h] for h in STORED_HEADERS if h in response.headers},
+        }
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        with self._lock:
+            previous = sum(os.path.getsize(p) for p in (meta_path, body_path) if os.path.exists(p))
+            for path, data in ((body_path, response.content),
+                               (meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))):
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            self._size += len(response.content) + os.path.getsize(meta_path) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """刪除最久未使用的項目，直到總大小低於上限的九成"""
+        entries = []
+        for path in self._files():
+            if path.endswith('.json'):
+                body_path = path[:-len('.json')] + '.body'
+                size = os.path.getsize(path) + (os.path.getsize(body_path) if os.path.exists(body_path) else 0)
+                entries.append((os.path.getmtime(path), size, path, body_path))
+        entries.sort()
+        removed = 0
+        for _, size, meta_path, body_path in entries:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size -= size
+            removed += 1
+        logging.info(f"HTTP cache evicted {removed} entries ({self._size / 1024 ** 2:.1f} MB remaining)")
+
+    def build_response(self, request, meta, body, status):
+        return build_response(request, meta, body, status)
+
+
+def build_response(request, meta, body, status):
+    """以保存的內容組出 requests.Response，X-Cache 標頭標示來源（HIT、REVALIDATED、ARCHIVE）"""
+    response = requests.Response()
+    response.status_code = meta['status']
+    response.reason = 'OK'
+    response.url = meta['url']
+    response.headers = CaseInsensitiveDict(meta['headers'])
+    response.headers['X-Cache'] = status
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = body
+    response.request = request
+    return response
+
+
+default_cache = None
+
+
+def enable(directory, **kwargs):
+    """啟用所有 session 共用的回應快取"""
+    global default_cache
+    default_cache = ResponseCache(directory, **kwargs)
+    return default_cache
@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+class Checkpoint:
+    """以 SQLite 保存爬取進度，中斷後可從停下的地方繼續
+
+    frontier 表記錄每個已發現的項目（分類頁、分頁、法規）與其狀態 pending/done/failed；
+    meta 表保存探索階段是否完成、分頁游標等資訊。每次更新都立即提交。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS frontier (
+                    stage TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    payload TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL,
+                    PRIMARY KEY (stage, key)
+                )""")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def add_items(self, stage, items, key=None, done_unit=None, failed_unit=None):
+        """加入新發現的項目（已存在者保留原狀態）
+
+        done_unit=(stage, key) 會在同一交易中標記為完成；探索單位（分類頁、分頁）只抓到部分內容時
+        改傳 failed_unit，已找到的項目照樣加入，該單位標記為失敗，下次 --resume 重新探索。
+        """
+        rows = [(stage, key(item) if key else item, json.dumps(item, ensure_ascii=False), time.time())
+                for item in items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier (stage, key, payload, updated_at) VALUES (?, ?, ?, ?)", rows)
+            if done_unit:
+                self._mark(*done_unit, 'done')
+            if failed_unit:
+                self._mark(*failed_unit, 'failed')
+
+    def _mark(self, stage, key, status):
+        self._conn.execute("""
+            INSERT INTO frontier (stage, key, status, attempts, updated_at) VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT (stage, key) DO UPDATE SET
+                status = excluded.status, attempts = attempts + 1, updated_at = excluded.updated_at
+            """, (stage, key, status, time.time()))
+
+    def mark(self, stage, key, status):
+        with self._lock, self._conn:
+            self._mark(stage, key, status)
+
+    def is_done(self, stage, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM frontier WHERE stage = ? AND key = ?", (stage, key)).fetchone()
+        return bool(row) and row[0] == 'done'
+
+    def pending(self, stage):
+        """尚未完成（pending 或 failed）的項目，依發現順序排列"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM frontier WHERE stage = ? AND status != 'done' ORDER BY rowid",
+                (stage,)).fetchall()
+        return [json.loads(payload) for payload, in rows]
+
+    def iter_pending(self, stage, batch_size=1000):
+        """與 pending 相同，但分批讀取，記憶體中最多只有 batch_size 筆；只包含開始讀取時已存在的項目"""
+        with self._lock:
+            last_rowid = self._conn.execute("SELECT MAX(rowid) FROM frontier").fetchone()[0] or 0
+        after = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, payload FROM frontier WHERE stage = ? AND status != 'done' "
+                    "AND rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?",
+                    (stage, after, last_rowid, batch_size)).fetchall()
+            if not rows:
+                return
+            for after, payload in rows:
+                yield json.loads(payload)
+
+    def count_pending(self, stage):
+        return sum(n for status, n in self.counts(stage).items() if status != 'done')
+
+    def counts(self, stage):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM frontier WHERE stage = ? GROUP BY status", (stage,)).fetchall()
+        return dict(rows)
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def is_complete(self, phase):
+        return self.get_meta(f"{phase}_complete") == '1'
+
+    def mark_complete(self, phase):
+        self.set_meta(f"{phase}_complete", '1')
+
+    def unfinished_units(self, stage='law'):
+        """其他階段（分類頁、分頁等探索單位）中尚未完成的數量"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM frontier WHERE stage != ? AND status != 'done'", (stage,)).fetchone()[0]
+
+    def finish(self, stage='law'):
+        """探索完整且全部項目完成時刪除檢查點，否則保留讓下次 --resume 重試失敗的項目與探索單位"""
+        counts = self.counts(stage)
+        units = self.unfinished_units(stage)
+        discovered = self.is_complete('discovery')
+        self._conn.close()
+        remaining = sum(n for status, n in counts.items() if status != 'done')
+        if remaining or units or not discovered:
+            logging.info(f"Checkpoint kept at {self.path}: {remaining} {stage} items not done ({counts}), "
+                         f"{units} discovery units not done, discovery {'complete' if discovered else 'incomplete'}")
+            return
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(self.path + suffix)
+            except OSError:
+                pass
+        logging.info(f"All {counts.get('done', 0)} {stage} items done, removed checkpoint {self.path}")
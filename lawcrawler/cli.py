@@ -0,0 +1,178 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+from . import archive
+from . import cache
+from . import concurrency
+from . import metrics
+from . import parsing
+from . import session
+from .checkpoint import Checkpoint
+from .corpus import CorpusWriter
+from .manifest import Manifest
+from .output import JsonlShardWriter, PerFileWriter
+from .ratelimit import default_limiter
+from .scheduler import SlidingWindow
+
+
+def build_parser(description):
+    """建立各爬蟲共用的命令列參數解析器"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--engine', choices=['thread', 'async'], default='thread',
+                        help='抓取引擎：thread（預設）或 async（需安裝 httpx）')
+    parser.add_argument('--concurrency', type=int, default=100,
+                        help='async 引擎同時在途的請求數')
+    parser.add_argument('--workers', type=int, default=5,
+                        help='thread 引擎的工作執行緒數（同時在途的法規數）')
+    parser.add_argument('--listing-page-size', type=int, default=None,
+                        help='桃園市、高雄市列表頁要求的每頁筆數；網站不理會時仍依實際列數推算頁數')
+    parser.add_argument('--pool-size', type=int, default=None,
+                        help='每個主機保留的 HTTP 連線數，預設依 --workers（自適應模式為 --max-workers）推算')
+    parser.add_argument('--http2', action='store_true',
+                        help='以 httpx 送出請求，支援 HTTP/2 的主機共用少數連線（需安裝 httpx[http2]）')
+    parser.add_argument('--bulk', nargs='*', default=None, metavar='PATH_OR_URL',
+                        help='中央法規改由全國法規資料庫的整批下載壓縮檔（JSON 或 XML 的 zip）串流匯入，'
+                             '不逐部抓取；未指定來源時下載法律與命令兩個 JSON 壓縮檔')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='每個主機每秒最多請求數（含重試與轉址），預設依 lawcrawler.ratelimit.HOST_POLICIES')
+    parser.add_argument('--burst', type=int, default=None,
+                        help='每個主機允許的突發請求數，需搭配 --rate')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='依延遲與 5xx/429 自動調整每個主機的並行數（AIMD），以 --workers 為起始值')
+    parser.add_argument('--max-workers', type=int, default=32,
+                        help='自適應模式下每個主機的並行數上限')
+    parser.add_argument('--cache-dir', default=None,
+                        help='啟用磁碟回應快取（條件式 GET），指定快取目錄')
+    parser.add_argument('--cache-size', type=int, default=2048,
+                        help='回應快取大小上限（MB），超過時淘汰最久未使用的項目')
+    parser.add_argument('--listing-ttl', type=int, default=6 * 3600,
+                        help='列表頁快取的有效秒數，期間內不重新向伺服器確認')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量模式：只抓取列表日期或 HTTP 驗證標頭與上次不同的法規')
+    parser.add_argument('--manifest-dir', default='manifests',
+                        help='增量模式記錄各法規指紋的目錄，也用來保存新北市法規的端點記憶')
+    parser.add_argument('--race-endpoints', action='store_true',
+                        help='新北市法規沒有端點紀錄、也無法由代碼前綴預測時，同時請求 0202 與 0201')
+    parser.add_argument('--parser', choices=['html.parser', 'lxml'], default='html.parser',
+                        help='BeautifulSoup 解析器；lxml 較快但需安裝 lxml')
+    parser.add_argument('--targeted-parse', action='store_true',
+                        help='法規頁只解析需要的子樹（SoupStrainer），輸出與完整解析相同')
+    parser.add_argument('--parse-processes', type=int, default=0,
+                        help='以多個行程解析法規頁，突破 GIL 的限制；0（預設）表示在抓取執行緒中解析')
+    parser.add_argument('--resume', action='store_true',
+                        help='以 SQLite 檢查點記錄進度，中斷後再次執行會從停下的地方繼續')
+    parser.add_argument('--checkpoint-dir', default='checkpoints',
+                        help='檢查點檔案的目錄')
+    parser.add_argument('--archive', default=None,
+                        help='把抓到的原始回應封存到指定目錄（壓縮、只附加、以網址索引），供日後重新解析')
+    parser.add_argument('--reparse', default=None, metavar='ARCHIVE',
+                        help='重新解析模式：不連網，所有請求都由指定的封存回應')
+    parser.add_argument('--output', choices=['files', 'jsonl', 'sqlite'], default='files',
+                        help='輸出格式：files（預設，每部法規一個 JSON 檔）、jsonl（背景寫入會輪替的 JSONL 分片）'
+                             '或 sqlite（寫入 --corpus-db 語料庫並建立全文索引）')
+    parser.add_argument('--shard-size', type=int, default=5000,
+                        help='jsonl 輸出每個分片的法規數')
+    parser.add_argument('--compress', action='store_true',
+                        help='jsonl 輸出以 gzip 壓縮（.jsonl.gz）')
+    parser.add_argument('--corpus-db', default='corpus.sqlite',
+                        help='sqlite 輸出的語料庫檔案，所有網站可共用同一個檔案')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='在 127.0.0.1 的指定埠開啟指標端點：/metrics（Prometheus）與 /stats（JSON）')
+    parser.add_argument('--metrics-dir', default='metrics',
+                        help='結束時寫入各階段耗時與計數的 JSON 摘要的目錄；空字串表示不寫入')
+    return parser
+
+
+def parse_args(description, argv=None):
+    """解析各爬蟲共用的命令列參數"""
+    parser = build_parser(description)
+    return check_args(parser, parser.parse_args(argv))
+
+
+def check_args(parser, args):
+    """檢查參數之間的相依關係，不合法時以 parser.error 結束"""
+    if args.burst is not None and not args.rate:
+        # 突發上限只在 --rate 覆寫各主機的預設政策時才會套用
+        parser.error("--burst requires --rate")
+    return args
+
+
+def configure(args):
+    """依命令列參數設定共用的限速器等全域元件；同一行程只需呼叫一次"""
+    if args.rate:
+        default_limiter.configure(args.rate, args.burst)
+    if args.adaptive:
+        concurrency.enable(initial=args.workers, maximum=args.max_workers)
+    parsing.configure(args.parser, args.targeted_parse, args.parse_processes)
+    session.configure(args.pool_size or pool_size_for(args), args.http2)
+    metrics.configure(args.metrics_port, metrics_summary_path(args))
+    if args.reparse:
+        # 離線重新解析時請求不經過限速器，也不使用快取與封存
+        archive.enable_offline(args.reparse)
+        if args.engine == 'async':
+            logging.warning("Re-parse mode reads the archive through the thread engine")
+            args.engine = 'thread'
+        return
+    if args.cache_dir:
+        # async 引擎抓取法規頁時不查詢快取，也不寫入快取，只有探索頁會被快取
+        if args.engine == 'async':
+            logging.warning("The response cache is only supported by the thread engine; switching to it")
+            args.engine = 'thread'
+        cache.enable(args.cache_dir, max_bytes=args.cache_size * 1024 ** 2, listing_ttl=args.listing_ttl)
+    if args.archive:
+        # async 引擎以 httpx 直接抓取法規頁、不經過 CrawlerAdapter，封存檔中會缺少法規頁而無法重新解析
+        if args.engine == 'async':
+            logging.warning("Archiving is only supported by the thread engine; switching to it")
+            args.engine = 'thread'
+        archive.enable(args.archive)
+
+
+def metrics_summary_path(args):
+    """本次執行的指標摘要檔：以執行的腳本名稱與開始時間命名，例如 metrics/台中市法規-20240101-120000.json"""
+    if not args.metrics_dir:
+        return None
+    script = os.path.splitext(os.path.basename(sys.argv[0]))[0] or 'lawcrawler'
+    return os.path.join(args.metrics_dir, f"{script}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+
+
+def pool_size_for(args):
+    """連線池大小：工作執行緒數的兩倍，容納 get_many 的附屬請求與同時進行的探索，至少 10"""
+    workers = args.max_workers if args.adaptive else args.workers
+    return max(10, 2 * workers)
+
+
+def window_for(args, host):
+    """建立抓取法規內容用的工作佇列；自適應模式下在途上限由主機的控制器決定"""
+    controller = concurrency.get_controller(host)
+    if controller is None:
+        return SlidingWindow(max_workers=args.workers)
+    return SlidingWindow(max_workers=controller.maximum, max_in_flight=lambda: controller.limit)
+
+
+def open_manifest(args, site):
+    """增量模式下載入該網站上次的 manifest，否則回傳 None"""
+    if not args.incremental:
+        return None
+    if args.engine != 'thread':
+        logging.warning("Incremental mode is only supported by the thread engine; doing a full crawl")
+        return None
+    return Manifest(os.path.join(args.manifest_dir, f"{site}.json"))
+
+
+def open_checkpoint(args, site):
+    """--resume 時開啟（或建立）該網站的檢查點，否則回傳 None"""
+    if not args.resume:
+        return None
+    return Checkpoint(os.path.join(args.checkpoint_dir, f"{site}.sqlite"))
+
+
+def open_writer(args, site, directory, save):
+    """依 --output 建立輸出器；save(law_data) 為該網站原本逐檔儲存的函式"""
+    if args.output == 'jsonl':
+        return JsonlShardWriter(directory, site, shard_size=args.shard_size, compress=args.compress)
+    if args.output == 'sqlite':
+        return CorpusWriter(args.corpus_db, site)
+    return PerFileWriter(save)
@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+
+
+class AIMDController:
+    """依觀測到的延遲與錯誤調整單一主機的並行數（加法增加、乘法減少）
+
+    每收集 window 個樣本評估一次：p95 延遲與錯誤率都健康時並行數加一，
+    p95 超過目標時減半；遇到 5xx、429 或逾時則立即減半，之後冷卻 cooldown 秒。
+    """
+
+    def __init__(self, host, initial=5, minimum=1, maximum=32, target_p95=2.0,
+                 window=20, error_threshold=0.05, decrease_factor=0.5, cooldown=5.0):
+        self.host = host
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_p95 = target_p95
+        self.window = window
+        self.error_threshold = error_threshold
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self._samples = []
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency, error=False, reason=None):
+        """記錄一個請求的結果；error 為 True 表示 5xx、429 或逾時"""
+        with self._lock:
+            now = time.monotonic()
+            self._samples.append((latency, error))
+            if error and now >= self._cooldown_until:
+                self._decrease(now, reason or "error response")
+            elif len(self._samples) >= self.window:
+                self._evaluate(now)
+
+    def _p95(self):
+        latencies = sorted(latency for latency, _ in self._samples)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def _evaluate(self, now):
+        p95 = self._p95()
+        error_rate = sum(1 for _, error in self._samples if error) / len(self._samples)
+        if p95 > self.target_p95 and now >= self._cooldown_until:
+            self._decrease(now, f"p95 {p95:.2f}s > {self.target_p95:.2f}s")
+        elif p95 <= self.target_p95 and error_rate <= self.error_threshold and self.limit < self.maximum:
+            self.limit += 1
+            logging.info(f"[{self.host}] concurrency +1 -> {self.limit} (p95 {p95:.2f}s, errors {error_rate:.0%})")
+        else:
+            logging.info(f"[{self.host}] concurrency hold at {self.limit} (p95 {p95:.2f}s, errors {error_rate:.0%})")
+        self._samples.clear()
+
+    def _decrease(self, now, reason):
+        previous = self.limit
+        self.limit = max(self.minimum, int(self.limit * self.decrease_factor))
+        self._cooldown_until = now + self.cooldown
+        self._samples.clear()
+        logging.info(f"[{self.host}] concurrency {previous} -> {self.limit} ({reason})")
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+settings = {'enabled': False}
+
+
+def enable(**kwargs):
+    """啟用自適應並行控制，kwargs 作為新建控制器的參數"""
+    settings.update(kwargs, enabled=True)
+
+
+def get_controller(host):
+    """取得主機的控制器；未啟用自適應模式時回傳 None"""
+    if not settings['enabled']:
+        return None
+    with _controllers_lock:
+        if host not in _controllers:
+            kwargs = {k: v for k, v in settings.items() if k != 'enabled'}
+            _controllers[host] = AIMDController(host, **kwargs)
+        return _controllers[host]
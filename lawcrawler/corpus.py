@@ -0,0 +1,261 @@
+"""跨網站的法規語料庫：以正規化的 SQLite 資料表保存法規與條文，並建立 FTS5 全文索引
+
+爬取時以 --output sqlite 寫入；既有的 JSON/JSONL 輸出可用 import 匯入。
+
+    python -m lawcrawler.corpus import law_jsons taipei_law_jsons ...
+    python -m lawcrawler.corpus search 個人資料 --site central taipei
+"""
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from . import metrics
+from .output import BackgroundWriter
+
+# 各網站爬蟲預設的輸出目錄，匯入時依目錄判斷資料來源
+SITE_DIRS = {
+    'law_jsons': 'central',
+    'taipei_law_jsons': 'taipei',
+    'taichung_law_jsons': 'taichung',
+    'ntpc_law_jsons': 'ntpc',
+    'taoyuan_law_jsons': 'taoyuan',
+    'kaohsiung_law_jsons': 'kaohsiung',
+}
+
+# trigram 分詞不需要中文斷詞，任意連續三個字以上的子字串都能由索引查詢
+TRIGRAM_MIN_LENGTH = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS laws (
+    id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    law_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    url TEXT,
+    category TEXT,
+    modified_date TEXT,
+    updated_at REAL,
+    UNIQUE (site, law_key)
+);
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    law_id INTEGER NOT NULL REFERENCES laws (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    chapter TEXT,
+    number TEXT,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_law_id ON articles (law_id);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5 (
+    content, content='articles', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+
+def _article_rows(record):
+    """把各網站不同欄位名稱的條文轉為 (chapter, number, content)，章節標題轉為後續條文的 chapter"""
+    articles = record.get('LawArticles') or record.get('Articles') or []
+    chapter = ""
+    rows = []
+    for article in articles:
+        number = article.get('ArticleNo') or article.get('ArticleNumber') or article.get('Number') or ""
+        content = article.get('ArticleContent') or article.get('Content') or ""
+        if number == "章節":
+            chapter = content
+            continue
+        rows.append((article.get('Chapter', chapter), number, content))
+    return rows
+
+
+def normalize(site, record):
+    """把單一網站的法規資料轉為 laws 表的欄位與條文列"""
+    name = record.get('LawName', '')
+    url = record.get('LawURL', '')
+    law = {
+        'site': site,
+        # 新北市的資料沒有網址，以法規名稱識別
+        'law_key': url or name,
+        'name': name,
+        'url': url,
+        'category': record.get('LawCategory', ''),
+        'modified_date': record.get('LawModifiedDate') or record.get('LastModified', ''),
+    }
+    return law, _article_rows(record)
+
+
+class Corpus:
+    """法規語料庫；同一部法規再次寫入時以新資料取代"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # 同時爬取多個網站時各自的寫入執行緒共用同一個檔案，寫入鎖被佔用時等待
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+        self.fts = self._create_fts()
+
+    def _create_fts(self):
+        try:
+            with self._conn:
+                self._conn.executescript(FTS_SCHEMA)
+            return True
+        except sqlite3.OperationalError as e:
+            # SQLite 3.34 以前沒有 trigram 分詞器；仍可寫入，查詢改用 LIKE 掃描
+            logging.warning(f"FTS5 trigram index unavailable ({e}); searches will scan articles")
+            return False
+
+    def add_laws(self, site, records):
+        """在單一交易中寫入多部法規"""
+        now = time.time()
+        with self._conn:
+            for record in records:
+                law, articles = normalize(site, record)
+                self._conn.execute("DELETE FROM laws WHERE site = ? AND law_key = ?", (site, law['law_key']))
+                law_id = self._conn.execute(
+                    "INSERT INTO laws (site, law_key, name, url, category, modified_date, updated_at) "
+                    "VALUES (:site, :law_key, :name, :url, :category, :modified_date, :updated_at)",
+                    dict(law, updated_at=now)).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO articles (law_id, seq, chapter, number, content) VALUES (?, ?, ?, ?, ?)",
+                    [(law_id, seq, chapter, number, content)
+                     for seq, (chapter, number, content) in enumerate(articles)])
+
+    def search(self, query, sites=None, limit=20):
+        """搜尋條文內容，回傳 (site, 法規名稱, 條號, 條文) 的列表
+
+        三個字以上使用 FTS5 索引；更短的關鍵字 trigram 無法索引，改用 LIKE 掃描。
+        """
+        site_filter = ""
+        params = []
+        if sites:
+            site_filter = f" AND laws.site IN ({','.join('?' * len(sites))})"
+            params = list(sites)
+        if self.fts and len(query) >= TRIGRAM_MIN_LENGTH:
+            sql = ("SELECT laws.site, laws.name, articles.number, articles.content "
+                   "FROM articles_fts JOIN articles ON articles.id = articles_fts.rowid "
+                   "JOIN laws ON laws.id = articles.law_id "
+                   f"WHERE articles_fts MATCH ?{site_filter} ORDER BY rank LIMIT ?")
+            match = '"' + query.replace('"', '""') + '"'
+            return self._conn.execute(sql, [match] + params + [limit]).fetchall()
+        sql = ("SELECT laws.site, laws.name, articles.number, articles.content "
+               "FROM articles JOIN laws ON laws.id = articles.law_id "
+               f"WHERE articles.content LIKE ? ESCAPE '\\'{site_filter} LIMIT ?")
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return self._conn.execute(sql, [pattern] + params + [limit]).fetchall()
+
+    def counts(self):
+        return dict(self._conn.execute("SELECT site, COUNT(*) FROM laws GROUP BY site").fetchall())
+
+    def close(self):
+        self._conn.close()
+
+
+class CorpusWriter(BackgroundWriter):
+    """爬取時把法規寫入語料庫；背景執行緒每一批資料使用一個交易"""
+
+    def __init__(self, path, site, **kwargs):
+        self.path = path
+        self.site = site
+        self._corpus = None
+        super().__init__(f"{site}-corpus", **kwargs)
+
+    def _write_batch(self, batch):
+        # SQLite 連線只在背景執行緒中建立與使用
+        if self._corpus is None:
+            self._corpus = Corpus(self.path)
+        with metrics.timer('write'):
+            self._corpus.add_laws(self.site, batch)
+
+    def _finish(self):
+        if self._corpus is not None:
+            self._corpus.close()
+
+    def close(self):
+        super().close()
+        logging.info(f"Wrote {self.written} laws to corpus {self.path}")
+
+
+def iter_output_records(directory):
+    """讀取爬蟲輸出目錄中的逐檔 JSON 與 JSONL 分片"""
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            yield json.load(f)
+    for path in sorted(glob.glob(os.path.join(directory, '*.jsonl')) + glob.glob(os.path.join(directory, '*.jsonl.gz'))):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def import_directory(corpus, directory, site=None, batch_size=500):
+    """把既有的輸出目錄匯入語料庫，回傳匯入的法規數"""
+    site = site or SITE_DIRS.get(os.path.basename(os.path.normpath(directory)))
+    if site is None:
+        raise ValueError(f"Cannot tell which site {directory} belongs to; pass --site")
+    batch = []
+    imported = 0
+    for record in iter_output_records(directory):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            corpus.add_laws(site, batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        corpus.add_laws(site, batch)
+        imported += len(batch)
+    logging.info(f"Imported {imported} {site} laws from {directory}")
+    return imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="法規語料庫：匯入爬蟲輸出與全文搜尋")
+    parser.add_argument('--db', default='corpus.sqlite', help='語料庫檔案')
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help='匯入爬蟲輸出目錄（逐檔 JSON 或 JSONL 分片）')
+    importer.add_argument('directories', nargs='+')
+    importer.add_argument('--site', default=None, help='目錄名稱不是預設輸出目錄時指定資料來源')
+    searcher = commands.add_parser('search', help='搜尋所有法規的條文')
+    searcher.add_argument('query')
+    searcher.add_argument('--site', nargs='+', default=None, help='只搜尋指定網站')
+    searcher.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    corpus = Corpus(args.db)
+    try:
+        if args.command == 'import':
+            for directory in args.directories:
+                import_directory(corpus, directory, args.site)
+            logging.info(f"Corpus now holds {corpus.counts()}")
+        else:
+            started = time.perf_counter()
+            rows = corpus.search(args.query, args.site, args.limit)
+            elapsed = (time.perf_counter() - started) * 1000
+            for site, name, number, content in rows:
+                print(f"[{site}] {name} {number}\n    {content}")
+            print(f"{len(rows)} results in {elapsed:.1f} ms")
+    finally:
+        corpus.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import collections
+import json
+import logging
+import os
+import threading
+
+
+class EndpointMemory:
+    """記住每部法規實際可用的端點，並依識別碼前綴預測新法規的端點
+
+    有些網站的法規內容分散在多個端點（例如新北市的 FLAWDAT0202 與 FLAWDAT0201），
+    依固定順序嘗試時，位於後面端點的法規每次都多花一個請求。這裡把成功的端點存成
+    JSON，下次直接先試；沒有紀錄的法規則看相同前綴的法規大多使用哪個端點。
+    """
+
+    def __init__(self, path, candidates, min_samples=5, min_share=0.8, prefix_lengths=(6, 5, 4, 3, 2, 1)):
+        self.path = path
+        self.candidates = list(candidates)
+        self.min_samples = min_samples
+        self.min_share = min_share
+        self.prefix_lengths = prefix_lengths
+        self.requests = 0
+        self.wasted = 0
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as f:
+                self._endpoints = json.load(f)
+        except (OSError, ValueError):
+            self._endpoints = {}
+        self._prefixes = collections.defaultdict(collections.Counter)
+        for key, endpoint in self._endpoints.items():
+            self._count(key, endpoint, 1)
+        logging.info(f"Loaded endpoint memory {path} with {len(self._endpoints)} entries")
+
+    def _count(self, key, endpoint, delta):
+        for length in self.prefix_lengths:
+            if len(key) > length:
+                self._prefixes[key[:length]][endpoint] += delta
+
+    def predict(self, key):
+        """回傳 (端點, 依據)；依據為 memory、prefix，沒有把握時回傳 (None, None)"""
+        with self._lock:
+            if key in self._endpoints:
+                return self._endpoints[key], 'memory'
+            for length in self.prefix_lengths:
+                counts = self._prefixes.get(key[:length])
+                if not counts:
+                    continue
+                total = sum(counts.values())
+                endpoint, hits = counts.most_common(1)[0]
+                if total >= self.min_samples and hits / total >= self.min_share:
+                    return endpoint, 'prefix'
+        return None, None
+
+    def order(self, key):
+        """依預測結果排列要嘗試的端點；沒有預測時維持原本的順序"""
+        endpoint, _ = self.predict(key)
+        if endpoint not in self.candidates:
+            return list(self.candidates)
+        return [endpoint] + [c for c in self.candidates if c != endpoint]
+
+    def record(self, key, endpoint, requests):
+        """記錄成功的端點；requests 為這部法規實際送出的請求數，多於一個即為浪費"""
+        with self._lock:
+            previous = self._endpoints.get(key)
+            if previous != endpoint:
+                if previous:
+                    self._count(key, previous, -1)
+                self._count(key, endpoint, 1)
+                self._endpoints[key] = endpoint
+            self.requests += requests
+            self.wasted += requests - 1
+
+    def record_failure(self, requests):
+        with self._lock:
+            self.requests += requests
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._endpoints, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def log_summary(self, site):
+        logging.info(f"[{site}] Endpoint memory: {self.requests} content requests, {self.wasted} wasted on "
+                     f"the wrong endpoint, {len(self._endpoints)} laws remembered")
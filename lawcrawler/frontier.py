@@ -0,0 +1,71 @@
+import logging
+import re
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 各網站法規的穩定識別碼：同一部法規可能出現在多個分類或分頁，網址參數順序也可能不同
+LAW_ID_PATTERNS = [
+    ('pcode', re.compile(r'[?&]pcode=([A-Za-z0-9]+)', re.IGNORECASE)),    # 中央法規 LawAll.aspx?PCODE=
+    ('fl', re.compile(r'/FL(\d+)', re.IGNORECASE)),                       # 台北市 LawInformation/FL...
+    ('fcode', re.compile(r'[?&]fcode=([A-Za-z0-9]+)', re.IGNORECASE)),    # 新北市 FLAWDAT0202.aspx?fcode=
+    ('id', re.compile(r'LawContent\.aspx\?(?:[^#]*&)?id=([^&#]+)', re.IGNORECASE)),  # 台中、桃園、高雄
+]
+
+
+def normalize_url(url):
+    """沒有已知識別碼時的退路：主機小寫、去掉片段、查詢參數排序"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
+
+
+def canonical_id(item):
+    """把法規網址（或含 url / fcode 的項目）轉為穩定的識別碼"""
+    if isinstance(item, dict):
+        if item.get('fcode'):
+            return f"fcode:{item['fcode'].upper()}"
+        item = item.get('url', '')
+    host = (urlsplit(item).hostname or '').lower()
+    for kind, pattern in LAW_ID_PATTERNS:
+        match = pattern.search(item)
+        if match:
+            # PCODE、fcode 不分大小寫，其餘識別碼保留原樣
+            value = match.group(1).upper() if kind in ('pcode', 'fcode') else match.group(1)
+            return f"{host}:{kind}:{value}"
+    return normalize_url(item)
+
+
+class Frontier:
+    """排程前去除重複的法規，依 canonical_id 判斷；可同時給多個執行緒使用
+
+    requests_per_item 為每部法規需要的請求數（例如台北市需抓資訊頁與條文頁兩頁），
+    用來回報省下的請求數。
+    """
+
+    def __init__(self, site, requests_per_item=1, key=canonical_id):
+        self.site = site
+        self.requests_per_item = requests_per_item
+        self.key = key
+        self.duplicates = 0
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def add(self, item):
+        """第一次看到時回傳 True"""
+        key = self.key(item)
+        with self._lock:
+            if key in self._seen:
+                self.duplicates += 1
+                return False
+            self._seen.add(key)
+            return True
+
+    def filter(self, items):
+        """依序產生尚未出現過的項目；輸入可以是 generator"""
+        for item in items:
+            if self.add(item):
+                yield item
+
+    def log_summary(self):
+        logging.info(f"[{self.site}] Frontier kept {len(self._seen)} laws, dropped {self.duplicates} duplicates "
+                     f"({self.duplicates * self.requests_per_item} requests saved)")
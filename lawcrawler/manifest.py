@@ -0,0 +1,105 @@
+import collections
+import hashlib
+import json
+import logging
+import os
+import threading
+from urllib.parse import urlsplit
+
+from requests.exceptions import RequestException
+
+# 增量模式下，指紋與上次相同而略過的法規
+UNCHANGED = object()
+# 同一主機連續這麼多次 HEAD 都沒有 ETag 或 Last-Modified，之後便不再發出 HEAD
+HEAD_PROBE_LIMIT = 3
+
+_head_lock = threading.Lock()
+# 主機 -> 沒有驗證標頭的 HEAD 次數；曾回傳驗證標頭的主機不再計數
+_head_misses = collections.Counter()
+_hosts_with_validators = set()
+
+
+class Manifest:
+    """記錄上次爬取時每部法規的版本指紋（列表頁日期或 HTTP 驗證標頭），供增量模式比對"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+        logging.info(f"Loaded manifest {path} with {len(self._entries)} entries")
+
+    def unchanged(self, key, fingerprint):
+        """沒有指紋時無法判斷，一律視為已變更"""
+        return bool(fingerprint) and self._entries.get(key) == fingerprint
+
+    def update(self, key, fingerprint):
+        if fingerprint:
+            with self._lock:
+                self._entries[key] = fingerprint
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def head_fingerprint(session, url):
+    """以 HEAD 請求取得 ETag 或 Last-Modified 作為頁面指紋
+
+    主機的前幾次 HEAD 都沒有驗證標頭時，之後直接回傳空字串、不再發出請求，
+    改由 fetch_if_changed 比對抓取後的內容雜湊。
+    """
+    host = urlsplit(url).hostname or ''
+    with _head_lock:
+        if host not in _hosts_with_validators and _head_misses[host] >= HEAD_PROBE_LIMIT:
+            return ''
+    try:
+        response = session.head(url, allow_redirects=True, timeout=10)
+    except RequestException:
+        return ''
+    if response.status_code != 200:
+        return ''
+    fingerprint = response.headers.get('ETag') or response.headers.get('Last-Modified') or ''
+    with _head_lock:
+        if fingerprint:
+            _hosts_with_validators.add(host)
+        elif host not in _hosts_with_validators:
+            _head_misses[host] += 1
+            if _head_misses[host] == HEAD_PROBE_LIMIT:
+                logging.warning(f"{host} sends no ETag or Last-Modified; skipping HEAD requests and "
+                                f"comparing content hashes after each fetch instead")
+    return fingerprint
+
+
+def content_fingerprint(law_data):
+    """沒有驗證標頭時，以抓取後的法規資料雜湊作為指紋"""
+    data = json.dumps(law_data, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return 'sha256:' + hashlib.sha256(data).hexdigest()
+
+
+def fetch_if_changed(manifest, key, fingerprint, fetch):
+    """增量模式下指紋未變時回傳 UNCHANGED，否則呼叫 fetch() 並在成功後更新 manifest
+
+    fingerprint 為函式，只有在增量模式下才會呼叫（可能需要發出 HEAD 請求）。沒有指紋時
+    仍須抓取，但內容雜湊與上次相同時同樣回傳 UNCHANGED，不重新寫出。
+    """
+    if manifest is None:
+        return fetch()
+    current = fingerprint()
+    if manifest.unchanged(key, current):
+        return UNCHANGED
+    law_data = fetch()
+    if law_data and not current:
+        current = content_fingerprint(law_data)
+        if manifest.unchanged(key, current):
+            return UNCHANGED
+    if law_data:
+        manifest.update(key, current)
+    return law_data
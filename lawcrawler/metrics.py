@@ -0,0 +1,261 @@
+"""爬取各階段的耗時直方圖與計數器，依主機分類
+
+階段：
+    wait      限速器等待（sleep）
+    connect   建立新連線（DNS 查詢、TCP 與 TLS 握手）
+    ttfb      送出請求到收到回應標頭，不含 connect，含 urllib3 的重試與退避
+    download  讀取回應內容
+    parse     解析法規頁（啟用 --parse-processes 時含等待解析行程的時間）
+    serialize 把法規資料序列化為 JSON
+    write     寫入磁碟或語料庫
+
+網路階段以主機分類，其餘階段的主機標籤為 local。比較各階段的總耗時即可看出爬取受限於
+網路、限速還是解析。--metrics-port 開啟本機 HTTP 端點：/metrics 為 Prometheus 文字格式，
+/stats 為 JSON；結束時把同樣的 JSON 摘要寫入 --metrics-dir。
+"""
+import atexit
+import bisect
+import collections
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAGES = ('wait', 'connect', 'ttfb', 'download', 'parse', 'serialize', 'write')
+# 非網路階段的主機標籤
+LOCAL = 'local'
+# 直方圖的上界（秒）
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+COUNTER_HELP = {
+    'requests_total': 'HTTP responses received, by host and status',
+    'response_bytes_total': 'Response body bytes downloaded',
+    'retries_total': 'Requests retried after an overload status',
+    'request_errors_total': 'Requests that failed with a transport error',
+    'laws_total': 'Laws processed, by result',
+}
+
+# port：HTTP 端點的埠號，None 表示不開啟；summary_path：結束時寫入 JSON 摘要的路徑
+settings = {'port': None, 'summary_path': None}
+
+_server = None
+
+
+class Histogram:
+    """固定上界的累計直方圖，與 Prometheus 的 histogram 相同"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """以所在區間的上界估計分位數；落在最後一個區間時回傳最大值"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50': round(self.quantile(0.50), 6),
+            'p95': round(self.quantile(0.95), 6),
+            'max': round(self.max, 6),
+        }
+
+
+class Registry:
+    """執行緒安全的指標集合；同一行程中所有 session、async 引擎與輸出器共用 default_registry"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._histograms = {}
+        self._counters = collections.Counter()
+        self._lock = threading.Lock()
+
+    def observe(self, stage, host, seconds):
+        with self._lock:
+            histogram = self._histograms.get((stage, host))
+            if histogram is None:
+                histogram = self._histograms[(stage, host)] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage, host=LOCAL):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, host, time.monotonic() - started)
+
+    def increment(self, name, amount=1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def record_response(self, host, started, received, status, size=None, connect=0.0, retries=0):
+        """記錄一個讀完內容的 HTTP 回應
+
+        started、received 為送出請求與收到回應標頭時的 time.monotonic()，呼叫時內容已讀完；
+        connect 為其間建立新連線的秒數，從 ttfb 中扣除。size 為 None 時（串流回應）不記錄 download。
+        """
+        now = time.monotonic()
+        if connect:
+            self.observe('connect', host, connect)
+        self.observe('ttfb', host, max(0.0, received - started - connect))
+        self.increment('requests_total', host=host, status=str(status))
+        if retries:
+            self.increment('retries_total', retries, host=host)
+        if size is not None:
+            self.observe('download', host, now - received)
+            self.increment('response_bytes_total', size, host=host)
+
+    def stage_totals(self):
+        """回傳 {階段: 所有主機的總秒數}，依 STAGES 的順序"""
+        totals = dict.fromkeys(STAGES, 0.0)
+        with self._lock:
+            for (stage, _), histogram in self._histograms.items():
+                totals[stage] = totals.get(stage, 0.0) + histogram.sum
+        return totals
+
+    def snapshot(self):
+        """目前所有指標的 JSON 可序列化表示（/stats 與結束時的摘要）"""
+        totals = self.stage_totals()
+        busy = sum(totals.values())
+        with self._lock:
+            stages = {}
+            for stage, total in totals.items():
+                hosts = {host: histogram.to_dict()
+                         for (name, host), histogram in sorted(self._histograms.items()) if name == stage}
+                stages[stage] = {
+                    'seconds': round(total, 6),
+                    'share': round(total / busy, 4) if busy else 0.0,
+                    'hosts': hosts,
+                }
+            counters = collections.defaultdict(list)
+            for (name, labels), value in sorted(self._counters.items()):
+                counters[name].append({'labels': dict(labels), 'value': value})
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'elapsed_seconds': round(time.time() - self.started, 3),
+            'stages': stages,
+            'counters': dict(counters),
+        }
+
+    def prometheus(self):
+        """Prometheus 文字格式（version 0.0.4）"""
+        lines = [
+            '# HELP lawcrawler_stage_seconds Time spent in each crawl stage',
+            '# TYPE lawcrawler_stage_seconds histogram',
+        ]
+        with self._lock:
+            for (stage, host), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{stage}",host="{_escape(host)}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'lawcrawler_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'lawcrawler_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'lawcrawler_stage_seconds_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'lawcrawler_stage_seconds_count{{{labels}}} {histogram.count}')
+            counters = sorted(self._counters.items())
+        for name in sorted({name for (name, _), _ in counters}):
+            lines.append(f'# HELP lawcrawler_{name} {COUNTER_HELP.get(name, name)}')
+            lines.append(f'# TYPE lawcrawler_{name} counter')
+            for (counter, labels), value in counters:
+                if counter == name:
+                    label_text = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels)
+                    lines.append(f'lawcrawler_{name}{{{label_text}}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def log_summary(self):
+        totals = self.stage_totals()
+        busy = sum(totals.values())
+        if not busy:
+            return
+        ranked = sorted(((seconds, stage) for stage, seconds in totals.items() if seconds), reverse=True)
+        logging.info("Stage time: " + ", ".join(f"{stage} {seconds:.1f}s ({seconds / busy:.0%})"
+                                                for seconds, stage in ranked))
+
+    def dump(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        summary = dict(self.snapshot(), command=sys.argv)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        logging.info(f"Wrote metrics summary to {path}")
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+default_registry = Registry()
+observe = default_registry.observe
+timer = default_registry.timer
+increment = default_registry.increment
+record_response = default_registry.record_response
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] == '/metrics':
+            body = default_registry.prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path.split('?')[0] == '/stats':
+            body = json.dumps(default_registry.snapshot(), ensure_ascii=False, indent=2).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host='127.0.0.1'):
+    """在背景執行緒開啟 /metrics 與 /stats 端點，回傳 HTTP 伺服器"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logging.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics and /stats")
+    return server
+
+
+def _finish():
+    default_registry.log_summary()
+    if settings['summary_path']:
+        default_registry.dump(settings['summary_path'])
+
+
+def configure(port=None, summary_path=None):
+    """開啟指標端點，並在行程結束時記錄各階段耗時、寫入 JSON 摘要；同一行程只需呼叫一次"""
+    global _server
+    settings['port'] = port
+    settings['summary_path'] = summary_path
+    if port is not None and _server is None:
+        _server = serve(port)
+    atexit.unregister(_finish)
+    atexit.register(_finish)
@@ -0,0 +1,109 @@
+import logging
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .scheduler import SlidingWindow
+
+
+def fetch_pages(fetch_page, pages, workers=5):
+    """頁數已知時並行抓取所有分頁，依完成順序產生 (page, result, error)
+
+    fetch_page(page) 失敗時記錄錯誤，result 為 None、error 為例外，由呼叫端決定如何記錄該頁。
+    """
+    with SlidingWindow(max_workers=workers) as window:
+        for page, result, error in window.imap_unordered(fetch_page, pages):
+            if error:
+                logging.error(f"Error on page {page}: {error}")
+            yield page, result, error
+
+
+def probe_then_fan_out(fetch_page, workers=5):
+    """頁數未知時先抓第一頁，再並行抓取分頁列上看得到的頁碼
+
+    fetch_page(page) 回傳 (items, max_page_seen)。分頁列通常只顯示附近幾頁，
+    因此每一輪抓完後若看到更大的頁碼，就再展開下一輪，直到沒有新頁碼為止。
+    依完成順序產生 (page, items, error)；第一頁失敗時直接拋出例外。
+    """
+    items, max_seen = fetch_page(1)
+    yield 1, items, None
+    fetched = {1}
+    while True:
+        pages = [page for page in range(2, max_seen + 1) if page not in fetched]
+        if not pages:
+            break
+        fetched.update(pages)
+        for page, result, error in fetch_pages(fetch_page, pages, workers):
+            if error:
+                yield page, None, error
+                continue
+            items, seen = result
+            max_seen = max(max_seen, seen)
+            yield page, items, None
+
+
+def set_query(url, params):
+    """在網址的查詢參數中設定（或覆寫）params"""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update({key: str(value) for key, value in params.items()})
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def page_url_template(first_url, next_url):
+    """比較第一頁網址與「下一頁」連結，找出頁碼參數
+
+    回傳 page -> 網址的函式；下一頁連結裡找不到值為 2 的新參數時回傳 None。
+    """
+    first = dict(parse_qsl(urlsplit(first_url).query, keep_blank_values=True))
+    for key, value in parse_qsl(urlsplit(next_url).query, keep_blank_values=True):
+        if value == '2' and first.get(key, '1') in ('', '1'):
+            return lambda page: set_query(next_url, {key: page})
+    return None
+
+
+def jump_to_pages(fetch_page, first_url, total_rows, workers=5, skip=None):
+    """列表頁以「下一頁」連結串接時，改由第一頁推算所有分頁網址後並行抓取
+
+    fetch_page(url) 回傳 (items, next_url, rows_on_page)。第一頁的列數與總筆數決定頁數，
+    下一頁連結決定頁碼參數；無法推算時沿著下一頁連結逐頁抓取。最後一頁若仍有下一頁連結
+    （總筆數低估），同樣繼續逐頁抓取。skip(page) 為真的分頁不會產出（續跑時已完成）。
+    依完成順序產生 (page, items, error)：並行抓取的分頁失敗時 error 為例外；第一頁或逐頁抓取時
+    失敗無法得知後面的分頁，直接拋出例外。總筆數超過一頁、第一頁卻沒有下一頁連結時同樣拋出例外。
+    """
+    skip = skip or (lambda page: False)
+    items, next_url, rows = fetch_page(first_url)
+    if not skip(1):
+        yield 1, items, None
+
+    url_for = page_url_template(first_url, next_url) if next_url else None
+    pages = -(-total_rows // rows) if total_rows and rows else 0
+    if pages > 1 and not next_url:
+        # 多半是下一頁連結的選擇器對不上；繼續下去會只抓到第一頁卻視為完成
+        raise ValueError(f"Listing has {total_rows} rows on {pages} pages but page 1 has no next-page link")
+    last = 1
+    if url_for and pages > 1:
+        logging.info(f"Listing has {total_rows} rows on {pages} pages of {rows}; fetching pages concurrently")
+        todo = [page for page in range(2, pages + 1) if not skip(page)]
+        next_url = None
+        for page, result, error in fetch_pages(lambda page: fetch_page(url_for(page)), todo, workers):
+            if error:
+                yield page, None, error
+                continue
+            items, page_next, _ = result
+            if page == pages:
+                next_url = page_next
+            yield page, items, None
+        last = pages
+        if pages not in todo:
+            # 最後一頁先前已完成，重新抓取以確認後面沒有更多分頁
+            _, next_url, _ = fetch_page(url_for(pages))
+    elif pages > 1:
+        logging.warning(f"Could not derive page URLs from the pager for {pages} pages; following next-page links")
+    elif next_url:
+        logging.info("Could not derive page URLs from the pager; following next-page links")
+
+    # 沿著下一頁連結逐頁抓取剩餘的分頁
+    while next_url:
+        last += 1
+        items, next_url, _ = fetch_page(next_url)
+        if not skip(last):
+            yield last, items, None
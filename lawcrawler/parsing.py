@@ -0,0 +1,95 @@
+import concurrent.futures
+import threading
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from . import metrics
+
+# 預設與原本相同使用 html.parser、完整建樹；可由 --parser / --targeted-parse 切換
+# processes 大於 0 時，解析交給多行程的解析階段執行（--parse-processes）
+settings = {'features': 'html.parser', 'targeted': False, 'processes': 0}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _classes(attrs):
+    classes = attrs.get('class') or []
+    return classes.split() if isinstance(classes, str) else list(classes)
+
+
+class TargetedStrainer(SoupStrainer):
+    """只保留需要的子樹：keep(name, classes, element_id) 為真的最外層標籤連同其所有後代
+
+    同時覆寫新版（allow_tag_creation）與舊版（search_tag）BeautifulSoup 的判斷介面。
+    """
+
+    def __init__(self, keep):
+        super().__init__(name=True)
+        self.keep = keep
+
+    def _matches(self, name, attrs):
+        attrs = dict(attrs or {})
+        return self.keep(name, _classes(attrs), attrs.get('id') or '')
+
+    def allow_tag_creation(self, nsprefix, name, attrs):  # bs4 >= 4.13
+        return self._matches(name, attrs)
+
+    def search_tag(self, markup_name=None, markup_attrs={}):  # bs4 < 4.13
+        if hasattr(markup_name, 'attrs'):
+            markup_name, markup_attrs = markup_name.name, markup_name.attrs
+        return markup_name if self._matches(markup_name, markup_attrs) else None
+
+
+def configure(features=None, targeted=None, processes=None):
+    if features:
+        settings['features'] = features
+    if targeted is not None:
+        settings['targeted'] = targeted
+    if processes is not None:
+        settings['processes'] = processes
+
+
+def make_soup(html, strainer=None, features=None, targeted=None):
+    """依目前設定建立 BeautifulSoup；targeted 模式下只解析 strainer 保留的子樹"""
+    features = features or settings['features']
+    targeted = settings['targeted'] if targeted is None else targeted
+    if targeted and strainer is not None:
+        return BeautifulSoup(html, features, parse_only=strainer)
+    return BeautifulSoup(html, features)
+
+
+def pool():
+    """解析階段的行程池，未啟用時回傳 None；第一次使用時才建立，子行程沿用目前的解析器設定"""
+    global _pool
+    if not settings['processes']:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=settings['processes'], initializer=configure,
+                initargs=(settings['features'], settings['targeted']))
+        return _pool
+
+
+def shutdown():
+    """關閉解析行程池並等待子行程結束（結束後才計入 RUSAGE_CHILDREN）；之後再使用時會重新建立"""
+    global _pool
+    with _pool_lock:
+        executor, _pool = _pool, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def run_parser(fn, *args):
+    """執行解析函式 fn(*args)
+
+    啟用解析階段時交給行程池並等待結果：抓取執行緒在等待期間不佔用 GIL，
+    BeautifulSoup 的工作分散到所有核心；同時待解析的頁面數不超過抓取執行緒數。
+    fn 與參數必須可以 pickle（模組層級的函式），且 fn 須回傳結果而非就地修改參數。
+    """
+    executor = pool()
+    with metrics.timer('parse'):
+        if executor is None:
+            return fn(*args)
+        return executor.submit(fn, *args).result()
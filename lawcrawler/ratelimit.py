@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from urllib.parse import urlsplit
+
+from . import metrics
+
+# 各政府網站的禮貌預算：(每秒請求數, 突發上限)
+HOST_POLICIES = {
+    'law.moj.gov.tw': (3.0, 5),
+    'www.laws.taipei.gov.tw': (3.0, 5),
+    'law.taichung.gov.tw': (3.0, 5),
+    'web.law.ntpc.gov.tw': (3.0, 5),
+    'law.tycg.gov.tw': (2.0, 3),
+    'outlaw.kcg.gov.tw': (2.0, 3),
+}
+DEFAULT_POLICY = (3.0, 5)
+
+
+class TokenBucket:
+    """執行緒安全的權杖桶，以預約方式保證長期速率不超過 rate"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """取得一個權杖，回傳需要等待的秒數"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self):
+        """等到取得權杖為止，回傳等待的秒數"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class HostRateLimiter:
+    """依主機分別限速，所有 session 與 async 引擎共用"""
+
+    def __init__(self, policies=None, default=DEFAULT_POLICY):
+        self.policies = dict(HOST_POLICIES if policies is None else policies)
+        self.default = default
+        self.override = None
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def configure(self, rate, burst=None):
+        """以同一組速率覆寫所有主機的設定（對應 --rate / --burst）"""
+        self.override = (rate, burst or max(1, int(rate)))
+        with self._lock:
+            self._buckets.clear()
+
+    def bucket(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                rate, burst = self.override or self.policies.get(host, self.default)
+                self._buckets[host] = TokenBucket(rate, burst)
+            return self._buckets[host]
+
+    def acquire(self, url):
+        host = urlsplit(url).hostname
+        metrics.observe('wait', host, self.bucket(host).acquire())
+
+    async def acquire_async(self, url):
+        host = urlsplit(url).hostname
+        metrics.observe('wait', host, await self.bucket(host).acquire_async())
+
+
+default_limiter = HostRateLimiter()
@@ -0,0 +1,102 @@
+"""桃園市、高雄市法規網共用的 LawResultList.aspx 列表頁
+
+兩個網站使用同一套法規系統，列表頁的表格、分頁列與每頁筆數參數都相同，
+只有網站根網址不同。
+"""
+import logging
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from .pagination import jump_to_pages, set_query
+
+# 列表頁每頁筆數的查詢參數（--listing-page-size）
+PAGE_SIZE_PARAM = 'PageSize'
+# 「下一頁」連結的 id 前綴含 Repeater 的列序號（ctlNN），會隨每頁筆數改變，只比對結尾
+NEXT_LINK_SELECTOR = "a[id$='_PagerButtom_hlNext']"
+
+
+def get_law_links_from_page(session, url, base_url):
+    """從單一頁面獲取所有法規連結，回傳 (法規連結, 下一頁網址, 本頁列數)；失敗時拋出例外"""
+    response = session.get(url)
+    soup = BeautifulSoup(response.text, 'html.parser')
+
+    law_links = []
+    listed = 0
+
+    # 獲取當前頁面的所有法規連結
+    rows = soup.select("table.table-hover tr")
+    for row in rows:
+        link = row.select_one("a[href*='LawContent.aspx']")
+        # 總筆數包含已廢止的法規，推算頁數時一併計入
+        if link:
+            listed += 1
+        # 跳過已廢止的法規
+        if row.select_one(".label-fei"):
+            continue
+
+        if link and link.get('href'):
+            full_url = urljoin(base_url, link['href'])
+            date_td = row.select_one("td:nth-of-type(2)")
+            date = date_td.text.strip() if date_td else ""
+
+            law_links.append({
+                'url': full_url,
+                'name': link.text.strip(),
+                'date': date
+            })
+
+    # 查找下一頁連結
+    next_page = soup.select_one(NEXT_LINK_SELECTOR)
+    next_page_url = None
+    if next_page and 'disabled' not in next_page.get('class', []) and next_page.get('href'):
+        next_page_url = urljoin(base_url, next_page['href'])
+
+    return law_links, next_page_url, listed
+
+
+def iter_law_links(session, start_url, base_url, total_laws=0, checkpoint=None, workers=5, page_size=None):
+    """抓取所有列表頁的法規連結，一發現就產出，讓內容抓取與探索同時進行
+
+    第一頁的總筆數與每頁列數決定頁數，「下一頁」連結決定頁碼參數，其餘分頁直接並行抓取；
+    page_size 指定時要求網站每頁列出更多筆（網站不支援時依實際列數計算）。
+    """
+    if checkpoint:
+        # 上次中斷前已發現、尚未完成的法規先交給內容抓取階段
+        yield from checkpoint.iter_pending('law')
+    if page_size:
+        start_url = set_query(start_url, {PAGE_SIZE_PARAM: page_size})
+
+    def fetch_page(url):
+        return get_law_links_from_page(session, url, base_url)
+
+    # 續跑時略過已完成的分頁
+    def done(page):
+        return bool(checkpoint) and checkpoint.is_done('page', str(page))
+
+    found = 0
+    pages = 0
+    failed = 0
+    try:
+        for page, links, error in jump_to_pages(fetch_page, start_url, total_laws, workers, skip=done):
+            if error:
+                # 失敗的分頁不能標記為完成，否則續跑時不會再抓
+                failed += 1
+                if checkpoint:
+                    checkpoint.mark('page', str(page), 'failed')
+                continue
+            if checkpoint:
+                checkpoint.add_items('law', links, key=lambda law: law['url'], done_unit=('page', str(page)))
+            found += len(links)
+            pages += 1
+            yield from links
+    except Exception as e:
+        # 第一頁或沿著下一頁連結抓取時失敗，無法得知後面還有哪些分頁
+        logging.error(f"Error getting law list pages: {e}")
+        failed += 1
+
+    if failed:
+        logging.warning(f"{failed} list pages failed; discovery is incomplete and will be retried with --resume")
+    elif checkpoint:
+        checkpoint.mark_complete('discovery')
+    logging.info(f"Found total {found} laws from {pages} pages")
@@ -0,0 +1,113 @@
+import concurrent.futures
+import queue
+import threading
+
+_DONE = object()
+
+# 同一行程內所有工作佇列共用的全域工作額度（例如同時爬取多個網站時），None 表示不限制
+settings = {'budget': None}
+
+
+def set_global_budget(workers):
+    """設定所有 SlidingWindow 合計的在途工作上限；0 或 None 取消限制"""
+    settings['budget'] = threading.BoundedSemaphore(workers) if workers else None
+
+
+class SlidingWindow:
+    """長駐的工作排程器：維持固定的在途上限，任一工作完成立刻補上下一個
+
+    取代「每批建立一個 ThreadPoolExecutor、等整批結束才開始下一批」的做法，
+    單一個慢頁面不會再拖住整批。輸入可以是 list 或 generator，會依需求逐一取用。
+    max_in_flight 可以是整數，或回傳目前上限的函式（例如自適應並行控制器）。
+    設定全域工作額度時，每個工作另外需要取得一份額度，跨網站的總並行數因此有上限。
+    """
+
+    def __init__(self, max_workers=5, max_in_flight=None):
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight or max_workers
+        self.budget = settings['budget']
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    def limit(self):
+        limit = self.max_in_flight() if callable(self.max_in_flight) else self.max_in_flight
+        return max(1, min(limit, self.max_workers))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def _acquire_budget(self, stop):
+        """取得一份全域工作額度；呼叫端中止時放棄並回傳 False"""
+        if self.budget is None:
+            return True
+        while not self.budget.acquire(timeout=0.5):
+            if stop.is_set():
+                return False
+        return True
+
+    def imap_unordered(self, fn, items):
+        """依完成順序產生 (item, result, error)；fn 拋出的例外放在 error 中"""
+        results = queue.Queue()
+        slots = threading.Condition()
+        in_flight = 0
+        stop = threading.Event()
+
+        def on_done(item, future):
+            nonlocal in_flight
+            if self.budget is not None:
+                self.budget.release()
+            with slots:
+                in_flight -= 1
+                slots.notify()
+            results.put((item, future))
+
+        def feed():
+            nonlocal in_flight
+            submitted = 0
+            try:
+                for item in items:
+                    with slots:
+                        # 上限可能隨時調整，定期醒來重新檢查
+                        while in_flight >= self.limit() and not stop.is_set():
+                            slots.wait(timeout=0.5)
+                        if stop.is_set():
+                            break
+                        in_flight += 1
+                    if not self._acquire_budget(stop):
+                        break
+                    future = self._executor.submit(fn, item)
+                    future.add_done_callback(lambda f, item=item: on_done(item, f))
+                    submitted += 1
+            except Exception as e:
+                results.put((_DONE, submitted, e))
+            else:
+                results.put((_DONE, submitted, None))
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+
+        received = 0
+        expected = None
+        feed_error = None
+        try:
+            while expected is None or received < expected:
+                entry = results.get()
+                if entry[0] is _DONE:
+                    _, expected, feed_error = entry
+                    continue
+                item, future = entry
+                received += 1
+                error = future.exception()
+                yield item, (None if error else future.result()), error
+        finally:
+            # 呼叫端提前中止時，讓 feeder 不再送出新工作
+            stop.set()
+            with slots:
+                slots.notify()
+        if feed_error is not None:
+            raise feed_error
@@ -0,0 +1,347 @@
+import collections
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, RetryError, Timeout
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from . import archive as response_archive
+from . import cache as response_cache
+from . import concurrency
+from . import metrics
+from .ratelimit import default_limiter
+
+try:
+    import httpx
+except ImportError:  # httpx 為選用套件，只有 HTTP/2 傳輸需要
+    httpx = None
+else:
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+# 視為主機過載的狀態碼
+OVERLOAD_STATUSES = {429, 500, 502, 503, 504}
+
+# get_many 送出同一部法規其餘頁面用的執行緒；與工作佇列分開，避免互相等待
+_companion_executor = None
+_companion_lock = threading.Lock()
+
+# 基準測試用：把所有請求改送到本機的模擬伺服器（例如 http://127.0.0.1:8000），原本的主機放在 Host 標頭
+HOST_OVERRIDE = os.environ.get('LAWCRAWLER_HOST_OVERRIDE')
+
+# pool_size：每個主機保留的連線數，None 時使用 requests 的預設值（10）；
+# http2：改以 httpx 送出請求，支援 HTTP/2 的主機由所有執行緒共用少數連線
+settings = {'pool_size': None, 'http2': False}
+
+# 目前執行緒在這個請求中建立新連線所花的秒數；urllib3 在送出請求的執行緒中連線，
+# 由 _send 歸零與讀取，把 connect 從 ttfb 中分出來
+_connecting = threading.local()
+# 目前執行緒正在送出的請求：原本的網址與限速器，供 urllib3 重試時向限速器取得額度
+_sending = threading.local()
+
+
+def redirect(url):
+    """回傳 (實際送出的網址, Host 標頭)；沒有設定 LAWCRAWLER_HOST_OVERRIDE 時原樣回傳，Host 為 None"""
+    if not HOST_OVERRIDE:
+        return url, None
+    parts = urlsplit(url)
+    target = urlsplit(HOST_OVERRIDE)
+    return urlunsplit(parts._replace(scheme=target.scheme, netloc=target.netloc)), parts.netloc
+
+
+def configure(pool_size=None, http2=False):
+    """設定之後建立的 CrawlerAdapter 的連線池大小與傳輸方式"""
+    if http2 and httpx is None:
+        raise RuntimeError("The HTTP/2 transport requires httpx: pip install 'httpx[http2]'")
+    settings['pool_size'] = pool_size
+    settings['http2'] = http2
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """累計建立連線（DNS 查詢、TCP 握手）耗時的連線"""
+
+    def connect(self):
+        started = time.monotonic()
+        try:
+            super().connect()
+        finally:
+            _connecting.seconds = getattr(_connecting, 'seconds', 0.0) + time.monotonic() - started
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    """累計建立連線（DNS 查詢、TCP 與 TLS 握手）耗時的連線"""
+
+    def connect(self):
+        started = time.monotonic()
+        try:
+            super().connect()
+        finally:
+            _connecting.seconds = getattr(_connecting, 'seconds', 0.0) + time.monotonic() - started
+
+
+class LimitedRetry(Retry):
+    """重試前先向主機限速器取得額度，讓 urllib3 的重試與原請求共用同一份每秒請求預算
+
+    urllib3 在送出請求的執行緒中重試，限速器與原本的網址由 CrawlerAdapter._send 放在 _sending。
+    """
+
+    @classmethod
+    def from_retry(cls, retry):
+        limited = cls.__new__(cls)
+        limited.__dict__.update(vars(retry))
+        return limited
+
+    def increment(self, *args, **kwargs):
+        retry = super().increment(*args, **kwargs)
+        limiter = getattr(_sending, 'limiter', None)
+        if limiter is not None:
+            limiter.acquire(_sending.url)
+        return retry
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+def _retried_statuses(response):
+    """取出 urllib3 在 Retry 中吞掉的中間狀態碼"""
+    retries = getattr(response.raw, 'retries', None)
+    return [h.status for h in getattr(retries, 'history', ()) if h.status]
+
+
+class CrawlerAdapter(HTTPAdapter):
+    """爬蟲共用的 HTTPAdapter
+
+    每個請求（包含 max_retries 的每次重試）送出前先向主機限速器取得額度，並回報延遲給自適應並行控制器；
+    啟用回應快取時以條件式 GET 重新驗證，收到 304 直接使用磁碟上的內容。
+    啟用封存時把成功的回應寫入封存檔；重新解析模式下所有請求都由封存回應，不連網也不限速。
+    """
+
+    def __init__(self, limiter=default_limiter, cache=None, archive=None, offline=None, http2=None, **kwargs):
+        self.limiter = limiter
+        self.cache = cache or response_cache.default_cache
+        self.archive = archive or response_archive.settings['record']
+        self.offline = offline or response_archive.settings['offline']
+        self.http2 = settings['http2'] if http2 is None else http2
+        if settings['pool_size']:
+            # 連線池小於同時在途的請求數時，多出來的連線用完即丟棄，下次又要重新握手
+            kwargs.setdefault('pool_maxsize', settings['pool_size'])
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._protocols = collections.Counter()
+        super().__init__(**kwargs)
+        if type(self.max_retries) is Retry:
+            self.max_retries = LimitedRetry.from_retry(self.max_retries)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        # 改用會量測連線耗時的連線池
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        if self.offline:
+            return self.offline.response(request)
+        response = self._send_cached(request, **kwargs)
+        if self.archive and request.method == 'GET' and response.status_code == 200:
+            # 由快取回應的內容若先前已封存就不重複寫入
+            if 'X-Cache' not in response.headers or not self.archive.contains(request.url):
+                self.archive.store(request.url, response)
+        return response
+
+    def _send_cached(self, request, **kwargs):
+        cache = self.cache if request.method == 'GET' else None
+        cached = cache.lookup(request.url) if cache else None
+        if cached:
+            meta, body = cached
+            if cache.is_fresh(request.url, meta):
+                return cache.build_response(request, meta, body, 'HIT')
+            request.headers.update(cache.validators(meta))
+
+        response = self._send(request, **kwargs)
+
+        if cache:
+            if response.status_code == 304 and cached:
+                response.content  # 讀完回應以歸還連線
+                cache.touch(request.url)
+                return cache.build_response(request, meta, body, 'REVALIDATED')
+            if response.status_code == 200:
+                cache.store(request.url, response)
+        return response
+
+    def _send(self, request, stream=False, **kwargs):
+        hostname = urlsplit(request.url).hostname
+        if self.limiter is not None:
+            self.limiter.acquire(request.url)
+        controller = concurrency.get_controller(hostname)
+        # 限速、快取與封存都以原本的網址為準，只有實際連線改送到 LAWCRAWLER_HOST_OVERRIDE
+        url = request.url
+        request.url, host = redirect(url)
+        if host:
+            request.headers['Host'] = host
+        _connecting.seconds = 0.0
+        _sending.url, _sending.limiter = url, self.limiter
+        started = time.monotonic()
+        try:
+            if self.http2:
+                response, retried, received = self._send_http2(request, **kwargs)
+            else:
+                response = super().send(request, stream=stream, **kwargs)
+                received = time.monotonic()
+                retried = _retried_statuses(response)
+                if not stream:
+                    # requests 之後本來也會讀完內容；在這裡讀才能分開量測 ttfb 與 download
+                    response.content
+        except (Timeout, ConnectionError, RetryError) as e:
+            metrics.increment('request_errors_total', host=hostname, reason=type(e).__name__)
+            if controller:
+                controller.record(time.monotonic() - started, error=True, reason=type(e).__name__)
+            raise
+        finally:
+            request.url = url
+            _sending.limiter = None
+        response.url = url
+        metrics.record_response(hostname, started, received, response.status_code,
+                                None if stream else len(response.content),
+                                connect=_connecting.seconds, retries=len(retried))
+        if controller:
+            statuses = retried + [response.status_code]
+            overloaded = [s for s in statuses if s in OVERLOAD_STATUSES]
+            controller.record(received - started, error=bool(overloaded),
+                              reason=f"HTTP {overloaded[0]}" if overloaded else None)
+        return response
+
+    def _http2_client(self):
+        with self._client_lock:
+            if self._client is None:
+                limits = httpx.Limits(max_connections=self._pool_maxsize,
+                                      max_keepalive_connections=self._pool_maxsize)
+                # 轉址與 Cookie 仍由 requests.Session 處理
+                self._client = httpx.Client(http2=True, limits=limits, follow_redirects=False)
+            return self._client
+
+    def _send_http2(self, request, timeout=None, **kwargs):
+        """以 httpx 送出請求並轉為 requests.Response；重試次數與退避沿用 max_retries 的設定
+
+        伺服器不支援 HTTP/2 時 httpx 會自動以 HTTP/1.1 連線。回傳 (回應, 被重試的狀態碼, 收到最後一個回應標頭的時間)；
+        httpx 建立連線的時間不另外量測，包含在 ttfb 中。
+        """
+        client = self._http2_client()
+        retry = self.max_retries
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+        else:
+            timeout = httpx.Timeout(timeout)
+        retried = []
+        last = retry.total or 0
+        for attempt in range(last + 1):
+            if attempt:
+                time.sleep(retry.backoff_factor * (2 ** (attempt - 1)))
+                if self.limiter is not None:
+                    self.limiter.acquire(_sending.url)
+            try:
+                response = client.send(client.build_request(request.method, request.url, headers=dict(request.headers),
+                                                            content=request.body, timeout=timeout), stream=True)
+                received = time.monotonic()
+                response.read()
+            except httpx.TimeoutException as e:
+                if attempt == last:
+                    raise Timeout(e, request=request)
+                continue
+            except httpx.TransportError as e:
+                if attempt == last:
+                    raise ConnectionError(e, request=request)
+                continue
+            if response.status_code not in (retry.status_forcelist or ()) or attempt == last:
+                break
+            retried.append(response.status_code)
+        self._protocols[(urlsplit(request.url).hostname, response.http_version)] += 1
+        return self._to_requests_response(request, response), retried, received
+
+    def _to_requests_response(self, request, response):
+        converted = requests.Response()
+        converted.status_code = response.status_code
+        converted.reason = response.reason_phrase
+        converted.url = str(response.url)
+        converted.headers = CaseInsensitiveDict(response.headers.items())
+        converted.encoding = get_encoding_from_headers(converted.headers)
+        converted._content = response.content
+        converted.elapsed = response.elapsed
+        converted.request = request
+        converted.connection = self
+        return converted
+
+    def connection_stats(self):
+        """回傳 {主機: {'requests': 請求數, 'connections': 新建連線數}}，用來檢查 keep-alive 的效果
+
+        HTTP/2 傳輸沒有 urllib3 連線池，改為依協定統計請求數（connections 為 None）。
+        """
+        stats = collections.defaultdict(lambda: {'requests': 0, 'connections': 0})
+        for key in self.poolmanager.pools.keys():
+            pool = self.poolmanager.pools.get(key)
+            if pool is not None:
+                stats[pool.host]['requests'] += pool.num_requests
+                stats[pool.host]['connections'] += pool.num_connections
+        for (host, protocol), count in self._protocols.items():
+            stats[f"{host} ({protocol})"] = {'requests': count, 'connections': None}
+        return dict(stats)
+
+    def close(self):
+        super().close()
+        if self._client is not None:
+            self._client.close()
+
+
+def log_connection_stats(session):
+    """在日誌回報 session 中每個主機的請求數與新建連線數；兩者越接近，keep-alive 越沒有發揮作用"""
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        if not isinstance(adapter, CrawlerAdapter):
+            continue
+        for host, counts in adapter.connection_stats().items():
+            if counts['connections'] is None:
+                logging.info(f"Connections to {host}: {counts['requests']} requests")
+            elif counts['requests']:
+                reused = 1 - counts['connections'] / counts['requests']
+                logging.info(f"Connections to {host}: {counts['requests']} requests over {counts['connections']} "
+                             f"connections ({reused:.0%} reused, pool size {adapter._pool_maxsize})")
+
+
+def _companions():
+    global _companion_executor
+    with _companion_lock:
+        if _companion_executor is None:
+            _companion_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=32, thread_name_prefix='companion')
+        return _companion_executor
+
+
+def get_many(session, urls, **kwargs):
+    """同時送出同一個項目需要的多個 GET 請求，依 urls 的順序回傳回應
+
+    適用於一部法規需要多個頁面的網站（例如台北市的資訊頁與條文頁）。
+    第一個請求在目前的執行緒送出，其餘交給背景執行緒；每個請求仍各自經過主機限速器。
+    任一請求失敗時拋出該例外。
+    """
+    futures = [_companions().submit(session.get, url, **kwargs) for url in urls[1:]]
+    try:
+        first = session.get(urls[0], **kwargs)
+    finally:
+        rest = [future.result() for future in futures]
+    return [first] + rest
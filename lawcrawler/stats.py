@@ -0,0 +1,46 @@
+import logging
+import threading
+import time
+
+from . import metrics
+
+
+class Throughput:
+    """統計處理速度（laws/sec），方便比較 thread 與 async 模式"""
+
+    def __init__(self, label='laws'):
+        self.label = label
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, ok=True):
+        with self._lock:
+            if ok:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+        metrics.increment(f'{self.label}_total', result='saved' if ok else 'failed')
+
+    def skip(self):
+        """增量模式下未變更而略過的項目"""
+        with self._lock:
+            self.skipped += 1
+        metrics.increment(f'{self.label}_total', result='unchanged')
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        elapsed = self.elapsed
+        return self.succeeded / elapsed if elapsed > 0 else 0.0
+
+    def log_summary(self, engine):
+        logging.info(
+            f"[{engine}] {self.succeeded} {self.label} saved, {self.failed} failed, {self.skipped} unchanged "
+            f"in {self.elapsed:.1f}s ({self.rate:.2f} {self.label}/sec)"
+        )
@@ -1,17 +1,22 @@
 from bs4.element import Tag
 from bs4 import BeautifulSoup
-import concurrent.futures
 import requests
-import json
 import os
 from urllib.parse import urljoin
 from tqdm import tqdm
 import re
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-import time
 import logging
-import random
+from lawcrawler.async_fetch import run_async
+from lawcrawler.bulk import iter_archive, open_archive
+from lawcrawler.cli import configure, open_checkpoint, open_manifest, open_writer, parse_args, window_for
+from lawcrawler.frontier import Frontier, canonical_id
+from lawcrawler.manifest import UNCHANGED, fetch_if_changed, head_fingerprint
+from lawcrawler.output import dump_json
+from lawcrawler.parsing import TargetedStrainer, make_soup, run_parser
+from lawcrawler.scheduler import SlidingWindow
+from lawcrawler.session import CrawlerAdapter, log_connection_stats
+from lawcrawler.stats import Throughput
 
 logging.basicConfig(
    level=logging.INFO,
@@ -36,7 +41,7 @@ def get_session():
        backoff_factor=0.5,
        status_forcelist=[500, 502, 503, 504]
    )
-   adapter = HTTPAdapter(max_retries=retry)
+   adapter = CrawlerAdapter(max_retries=retry)
    session.mount('http://', adapter)
    session.mount('https://', adapter)
    session.headers.update(HEADERS)
@@ -49,11 +54,18 @@ def get_category_links(session):
        soup = BeautifulSoup(response.text, 'html.parser')
        
        links = []
+       # 子清單會經由 find_next('ul') 與子節點各走訪一次，記錄已走訪的節點與已加入的連結
+       visited = set()
+       seen = set()
        def parse_tree(element):
+           if id(element) in visited:
+               return
+           visited.add(id(element))
            if element.name == 'a':
                if 'LawSearchLaw.aspx?TY=' in element.get('href', ''): 
                    href = urljoin(base_url, element['href'])
-                   if 'fei=1' not in href:
+                   if 'fei=1' not in href and href not in seen:
+                       seen.add(href)
                        links.append(href)
                elif 'javascript:void(0)' in element.get('href', ''):
                    next_ul = element.find_next('ul')
@@ -76,92 +88,258 @@ def get_category_links(session):
        return [], 0
 
 def get_law_links(category_url, session):
-   try:
-       time.sleep(random.uniform(1, 2))
-       response = session.get(category_url)
-       soup = BeautifulSoup(response.text, 'html.parser')
-       
-       links = []
-       table = soup.find('table', {'class': 'table table-hover tab-list tab-central'})
-       if table:
-           for a in table.find_all('a', href=re.compile(r'LawAll\.aspx\?PCODE=')):
-               href = urljoin("https://law.moj.gov.tw", a['href'])
-               links.append(href)
-       return links
-   except Exception as e:
-       logging.error(f"Error getting law links from {category_url}: {e}")
-       return []
+   """抓取分類頁的法規網址；失敗時拋出例外，由呼叫端把該分類標記為失敗"""
+   response = session.get(category_url)
+   soup = BeautifulSoup(response.text, 'html.parser')
+   
+   links = []
+   table = soup.find('table', {'class': 'table table-hover tab-list tab-central'})
+   if table:
+       for a in table.find_all('a', href=re.compile(r'LawAll\.aspx\?PCODE=')):
+           href = urljoin("https://law.moj.gov.tw", a['href'])
+           links.append(href)
+   return links
+
+# 法規頁只需要基本資料表格、法規名稱與條文列
+LAW_PAGE_STRAINER = TargetedStrainer(
+   lambda name, classes, element_id: name == 'table' or 'table' in classes or 'table-title' in classes
+   or 'row' in classes or element_id in ('hlLawName', 'trLNNDate', 'trLNODate')
+)
+
+def parse_law_json(html, url):
+   soup = make_soup(html, LAW_PAGE_STRAINER)
+   
+   modified_date_elem = (
+       soup.select_one("#trLNNDate td") or 
+       soup.select_one("#trLNODate td") or
+       soup.select_one(".table-title tr:contains('修正日期') td")
+   )
+   
+   law_data = {
+       "LawName": soup.select_one("#hlLawName").text.strip(),
+       "LawCategory": soup.select_one(".table tr:nth-child(3) td").text.strip(), 
+       "LawModifiedDate": ''.join(filter(str.isdigit, modified_date_elem.text)) if modified_date_elem else "",
+       "LawHistories": "",
+       "LawArticles": [],
+       "LawURL": url
+   }
+   
+   rows = soup.select('.row')
+   for row in rows:
+       article_no = row.select_one('.col-no a')
+       article = row.select_one('.law-article')
+       if article_no and article:
+           law_data["LawArticles"].append({
+               "ArticleNo": f"{law_data['LawName']}, {article_no.text.strip()}",
+               "ArticleContent": article.text.strip()
+           })
+   return law_data
 
 def get_law_json(url, session):
    try:
-       time.sleep(random.uniform(1, 2))
        response = session.get(url, timeout=10)
-       soup = BeautifulSoup(response.text, 'html.parser')
-       
-       modified_date_elem = (
-           soup.select_one("#trLNNDate td") or 
-           soup.select_one("#trLNODate td") or
-           soup.select_one(".table-title tr:contains('修正日期') td")
-       )
-       
-       law_data = {
-           "LawName": soup.select_one("#hlLawName").text.strip(),
-           "LawCategory": soup.select_one(".table tr:nth-child(3) td").text.strip(), 
-           "LawModifiedDate": ''.join(filter(str.isdigit, modified_date_elem.text)) if modified_date_elem else "",
-           "LawHistories": "",
-           "LawArticles": [],
-           "LawURL": url
-       }
-       
-       rows = soup.select('.row')
-       for row in rows:
-           article_no = row.select_one('.col-no a')
-           article = row.select_one('.law-article')
-           if article_no and article:
-               law_data["LawArticles"].append({
-                   "ArticleNo": f"{law_data['LawName']}, {article_no.text.strip()}",
-                   "ArticleContent": article.text.strip()
-               })
-       return law_data
-       
+       return run_parser(parse_law_json, response.text, url)
+   except Exception as e:
+       logging.error(f"Failed URL: {url}")
+       logging.error(f"Error: {str(e)}")
+       return None
+
+async def get_law_json_async(url, fetcher):
+   try:
+       html = await fetcher.get_text(url, timeout=10)
+       return await fetcher.parse(parse_law_json, html, url)
    except Exception as e:
        logging.error(f"Failed URL: {url}")
+       logging.error(f"Error: {str(e)}")
        return None
 
+# 全國法規資料庫的整批下載（法律與命令各一個 zip），--bulk 未指定來源時使用
+BULK_URLS = [
+   "https://law.moj.gov.tw/api/Ch/Law/JSON",
+   "https://law.moj.gov.tw/api/Ch/Order/JSON",
+]
+
+# XML 版的欄位名稱對應到 JSON 版
+BULK_XML_FIELDS = {
+   '法規名稱': 'LawName',
+   '法規網址': 'LawURL',
+   '法規類別': 'LawCategory',
+   '最新異動日期': 'LawModifiedDate',
+   '廢止註記': 'LawAbandonNote',
+   '沿革內容': 'LawHistories',
+}
+
+def bulk_xml_to_dict(element):
+   """把 XML 版的 <法規> 元素轉為與 JSON 版相同的欄位"""
+   law = {field: (element.findtext(tag) or "").strip() for tag, field in BULK_XML_FIELDS.items()}
+   law['LawArticles'] = []
+   content = element.find('法規內容')
+   for node in (content if content is not None else []):
+       if node.tag == '條文':
+           law['LawArticles'].append({
+               'ArticleType': 'A',
+               'ArticleNo': (node.findtext('條號') or "").strip(),
+               'ArticleContent': node.findtext('條文內容') or "",
+           })
+       else:
+           law['LawArticles'].append({'ArticleType': 'C', 'ArticleNo': "", 'ArticleContent': node.text or ""})
+   return law
+
+def bulk_law_json(law):
+   """把整批下載的一部法規轉為與爬取 LawAll.aspx 相同的輸出格式；已廢止的法規回傳 None"""
+   if law.get('LawAbandonNote'):
+       return None
+   name = law['LawName'].strip()
+   return {
+       "LawName": name,
+       "LawCategory": law.get('LawCategory', "").strip(),
+       "LawModifiedDate": ''.join(filter(str.isdigit, law.get('LawModifiedDate', ""))),
+       "LawHistories": law.get('LawHistories', "").strip(),
+       # 與網頁版相同，只保留條文，不含編章節標題
+       "LawArticles": [
+           {"ArticleNo": f"{name}, {article['ArticleNo'].strip()}", "ArticleContent": article['ArticleContent'].strip()}
+           for article in law.get('LawArticles') or [] if article.get('ArticleType', 'A') == 'A'
+       ],
+       "LawURL": law.get('LawURL', ""),
+   }
+
+def iter_bulk_laws(sources):
+   """依序串流每個來源（本機 zip 路徑或網址）中的法規，每次只在記憶體中保留一部"""
+   for source in sources or BULK_URLS:
+       with open_archive(source, headers=HEADERS) as archive:
+           for law in iter_archive(archive, json_key='Laws', xml_tag='法規'):
+               law_data = bulk_law_json(law if isinstance(law, dict) else bulk_xml_to_dict(law))
+               if law_data:
+                   yield law_data
+
+def bulk_law_key(law_data):
+   """整批匯入去除重複的識別碼；少數紀錄沒有法規網址，改以法規名稱區分，避免全部視為同一部"""
+   if law_data.get('LawURL'):
+       return canonical_id(law_data['LawURL'])
+   return f"name:{law_data['LawName']}"
+
+def run_bulk(args):
+   """整批匯入模式：以開放資料壓縮檔取代逐部抓取 LawAll.aspx"""
+   # 整批下載不發出逐部請求，去除重複只是避免同一部法規同時出現在法律與命令檔中
+   frontier = Frontier('central', requests_per_item=0, key=bulk_law_key)
+   writer = open_writer(args, 'central', 'law_jsons', save_law)
+   stats = Throughput()
+   for law_data in tqdm(frontier.filter(iter_bulk_laws(args.bulk)), desc="Importing Laws"):
+       writer.write(law_data)
+       stats.record()
+   writer.close()
+   frontier.log_summary()
+   stats.log_summary("bulk")
+
 def save_json(data, filename):
    os.makedirs('law_jsons', exist_ok=True)
    filepath = os.path.join('law_jsons', filename)
-   with open(filepath, 'w', encoding='utf-8') as f:
-       json.dump(data, f, ensure_ascii=False, indent=2)
+   dump_json(data, filepath)
 
-def main():
-   session = get_session()
-   category_links, total_laws = get_category_links(session)
+def save_law(law_data):
+   filename = f"{law_data['LawName']}.json"
+   save_json(law_data, filename)
+
+def iter_law_urls(category_links, session, workers=5, checkpoint=None):
+   """並行抓取各分類頁，法規網址一發現就產出，讓內容抓取與探索同時進行"""
+   if checkpoint:
+       # 上次中斷前已發現、尚未完成的法規先交給內容抓取階段
+       yield from checkpoint.iter_pending('law')
+       category_links = [url for url in category_links if not checkpoint.is_done('category', url)]
    
-   if not category_links:
-       logging.error("No category links found")
+   found = 0
+   failed = 0
+   with SlidingWindow(max_workers=workers) as window:
+       for category_url, urls, error in window.imap_unordered(lambda url: get_law_links(url, session), category_links):
+           if error:
+               # 失敗的分類不能標記為完成，否則續跑時不會再抓
+               logging.error(f"Error getting law links from {category_url}: {error}")
+               failed += 1
+               if checkpoint:
+                   checkpoint.mark('category', category_url, 'failed')
+               continue
+           if checkpoint:
+               checkpoint.add_items('law', urls, done_unit=('category', category_url))
+           found += len(urls)
+           yield from urls
+   
+   if failed:
+       logging.warning(f"{failed} categories failed; discovery is incomplete and will be retried with --resume")
+   elif checkpoint:
+       checkpoint.mark_complete('discovery')
+   logging.info(f"Found {found} law URLs in {len(category_links)} categories")
+
+def main(args=None):
+   if args is None:
+       args = parse_args("爬取中央法規")
+       configure(args)
+   if args.bulk is not None:
+       run_bulk(args)
        return
+   session = get_session()
+   checkpoint = open_checkpoint(args, 'central')
+   
+   if checkpoint and checkpoint.is_complete('discovery'):
+       total_laws = checkpoint.count_pending('law')
+       law_urls = checkpoint.iter_pending('law')
+       logging.info(f"Resuming from checkpoint with {total_laws} pending law URLs")
+   else:
+       category_links, total_laws = get_category_links(session)
        
-   all_law_urls = []
-   with tqdm(total=len(category_links), desc="Collecting law URLs") as pbar:
-       for category_url in category_links:
-           urls = get_law_links(category_url, session)
-           all_law_urls.extend(urls)
-           pbar.update(1)
+       if not category_links:
+           logging.error("No category links found")
+           return
+       
+       law_urls = iter_law_urls(category_links, session, args.workers, checkpoint)
    
-   logging.info(f"Found {len(all_law_urls)} total law URLs")
+   # 同一部法規可能掛在分類樹的多個分類下，排程前依 PCODE 去除重複
+   frontier = Frontier('central')
+   law_urls = frontier.filter(law_urls)
+   writer = open_writer(args, 'central', 'law_jsons', save_law)
+   if args.engine == 'async':
+       def on_result(url, law_data):
+           writer.write(law_data)
+           if checkpoint:
+               checkpoint.mark('law', url, 'done')
+       run_async(law_urls, get_law_json_async, on_result,
+                 headers=HEADERS, concurrency=args.concurrency, total=total_laws or None)
+       writer.close()
+       frontier.log_summary()
+       if checkpoint:
+           checkpoint.finish()
+       return
+   
+   manifest = open_manifest(args, 'central')
+   
+   def process(url):
+       return fetch_if_changed(manifest, url, lambda: head_fingerprint(session, url),
+                               lambda: get_law_json(url, session))
    
-   with tqdm(total=len(all_law_urls), desc="Processing Laws") as pbar:
-       for i in range(0, len(all_law_urls), 20):
-           batch = all_law_urls[i:i+20]
-           with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-               futures = [executor.submit(get_law_json, url, session) for url in batch]
-               
-               for future in concurrent.futures.as_completed(futures):
-                   law_data = future.result()
-                   if law_data:
-                       filename = f"{law_data['LawName']}.json"
-                       save_json(law_data, filename)
-                   pbar.update(1)
+   # 分類頁與法規內容同時抓取，進度條總數以分類樹上的法規數估計
+   stats = Throughput()
+   processed = 0
+   with window_for(args, "law.moj.gov.tw") as window, tqdm(total=total_laws or None, desc="Processing Laws") as pbar:
+       for url, law_data, error in window.imap_unordered(process, law_urls):
+           if law_data is UNCHANGED:
+               stats.skip()
+           else:
+               if law_data:
+                   writer.write(law_data)
+               stats.record(bool(law_data))
+           if checkpoint:
+               checkpoint.mark('law', url, 'failed' if law_data is None else 'done')
+           processed += 1
+           pbar.update(1)
                    
-   logging.info(f"Completed! Processed {len(all_law_urls)} laws")
+   writer.close()
+   if manifest:
+       manifest.save()
+   if checkpoint:
+       checkpoint.finish()
+   logging.info(f"Completed! Processed {processed} laws")
+   frontier.log_summary()
+   stats.log_summary("thread")
+   log_connection_stats(session)
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,70 @@
+import importlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 設置日誌（須在載入各網站爬蟲之前，其 basicConfig 才不會生效）
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(threadName)s - %(message)s',
+    handlers=[
+        logging.FileHandler('all_laws_crawler.log'),
+        logging.StreamHandler()
+    ]
+)
+
+from lawcrawler.cli import build_parser, check_args, configure  # noqa: E402
+from lawcrawler.scheduler import set_global_budget  # noqa: E402
+
+# 網站代號與對應的爬蟲模組；各網站為不同主機，可以同時爬取
+SITES = {
+    'central': '中央法規',
+    'taipei': '台北市法規',
+    'ntpc': '新北市法規',
+    'taoyuan': '桃園市法規',
+    'taichung': '台中市法規',
+    'kaohsiung': '高雄市法規',
+}
+
+def parse_args(argv=None):
+    parser = build_parser("同時爬取中央與各直轄市法規")
+    parser.add_argument('--sites', nargs='+', choices=list(SITES), default=list(SITES),
+                        help='要爬取的網站，預設全部')
+    parser.add_argument('--global-workers', type=int, default=16,
+                        help='所有網站合計同時在途的工作數上限；每個網站仍受 --workers 與各主機限速限制')
+    return check_args(parser, parser.parse_args(argv))
+
+def run_site(site, module, args):
+    """在目前執行緒執行單一網站的爬蟲，回傳耗時秒數"""
+    threading.current_thread().name = site
+    started = time.monotonic()
+    module.main(args)
+    return time.monotonic() - started
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure(args)
+    set_global_budget(args.global_workers)
+    # 先在主執行緒載入各網站模組，再交給各自的執行緒執行
+    modules = {site: importlib.import_module(SITES[site]) for site in args.sites}
+
+    started = time.monotonic()
+    durations = {}
+    with ThreadPoolExecutor(max_workers=len(modules)) as executor:
+        futures = {executor.submit(run_site, site, module, args): site for site, module in modules.items()}
+        for future in as_completed(futures):
+            site = futures[future]
+            try:
+                durations[site] = future.result()
+                logging.info(f"[{site}] finished in {durations[site]:.1f}s")
+            except Exception as e:
+                logging.error(f"[{site}] crawler failed: {e}")
+
+    total = time.monotonic() - started
+    slowest = max(durations.values(), default=0)
+    logging.info(f"Completed {len(durations)}/{len(args.sites)} sites in {total:.1f}s "
+                 f"(slowest site {slowest:.1f}s, sequential would be {sum(durations.values()):.1f}s)")
+
+if __name__ == "__main__":
+    main()
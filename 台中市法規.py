@@ -1,15 +1,20 @@
-import concurrent.futures
 import requests
-import json
 import os
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from tqdm import tqdm
 import logging
-import random
-import time
-from requests.adapters import HTTPAdapter
+import re
 from urllib3.util.retry import Retry
+from lawcrawler.async_fetch import run_async
+from lawcrawler.cli import configure, open_checkpoint, open_manifest, open_writer, parse_args, window_for
+from lawcrawler.frontier import Frontier
+from lawcrawler.manifest import UNCHANGED, fetch_if_changed, head_fingerprint
+from lawcrawler.output import dump_json
+from lawcrawler.pagination import probe_then_fan_out
+from lawcrawler.parsing import TargetedStrainer, make_soup, run_parser
+from lawcrawler.session import CrawlerAdapter, log_connection_stats
+from lawcrawler.stats import Throughput
 
 # 設置日誌
 logging.basicConfig(
@@ -24,7 +29,7 @@ logging.basicConfig(
 def get_session():
     session = requests.Session()
     retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = CrawlerAdapter(max_retries=retry)
     session.mount('http://', adapter)
     session.mount('https://', adapter)
     session.headers.update({
@@ -56,96 +61,147 @@ def get_categories(session, base_url="https://law.taichung.gov.tw/LawCategoryMai
         logging.error(f"Error getting categories: {e}")
         return []
 
-def get_law_links_from_page(session, base_url, category_url):
-    """從單一類別頁面獲取所有法規連結"""
-    all_links = []
-    page = 1
+def parse_category_page(html, base_url):
+    """解析類別分頁，回傳 (法規連結, 分頁列上看得到的最大頁碼)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    links = []
+    for row in soup.select("table.table-hover tr"):
+        # 跳過已廢除的法規
+        if row.select_one("span.label-fei"):
+            continue
+            
+        link = row.select_one("a[href*='LawContent.aspx']")
+        if link and link.get('href'):
+            full_url = urljoin(base_url, link['href'])
+            links.append(full_url)
     
-    while True:
+    # 分頁列上的頁碼
+    max_page = 1
+    for a in soup.select("a[href*='page=']"):
+        if match := re.search(r'[?&]page=(\d+)', a['href']):
+            max_page = max(max_page, int(match.group(1)))
+    
+    return links, max_page
+
+def get_law_links_from_page(session, base_url, category_url, workers=5):
+    """從單一類別頁面獲取所有法規連結：先抓第一頁得知頁碼，其餘分頁並行抓取
+
+    回傳 (法規連結, 失敗的分頁數)；第一頁失敗時拋出例外。
+    """
+    def fetch_page(page):
         url = f"{category_url}&page={page}" if '?' in category_url else f"{category_url}?page={page}"
-        
+        response = session.get(url)
+        return parse_category_page(response.text, base_url)
+    
+    all_links = []
+    failed = 0
+    for page, links, error in probe_then_fan_out(fetch_page, workers):
+        if error:
+            failed += 1
+            continue
+        all_links.extend(links)
+    
+    return all_links, failed
+
+def iter_law_links(session, base_url, category_links, workers=5, checkpoint=None):
+    """逐一抓取各類別的法規連結，一發現就產出，讓內容抓取與探索同時進行"""
+    if checkpoint:
+        # 上次中斷前已發現、尚未完成的法規先交給內容抓取階段
+        yield from checkpoint.iter_pending('law')
+    
+    found = 0
+    failed = 0
+    for category_url in category_links:
+        # 續跑時略過已完成的類別
+        if checkpoint and checkpoint.is_done('category', category_url):
+            continue
         try:
-            response = session.get(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            rows = soup.select("table.table-hover tr")
-            if not rows:
-                break
-                
-            for row in rows:
-                # 跳過已廢除的法規
-                if row.select_one("span.label-fei"):
-                    continue
-                    
-                link = row.select_one("a[href*='LawContent.aspx']")
-                if link and link.get('href'):
-                    full_url = urljoin(base_url, link['href'])
-                    all_links.append(full_url)
-            
-            # 檢查是否有下一頁
-            next_page = soup.select_one("a[href*='page={}']".format(page + 1))
-            if not next_page:
-                break
-                
-            page += 1
-            time.sleep(random.uniform(1, 2))
-            
+            links, failed_pages = get_law_links_from_page(session, base_url, category_url, workers)
         except Exception as e:
-            logging.error(f"Error getting laws from page {page}: {e}")
-            break
+            logging.error(f"Error getting laws from {category_url}: {e}")
+            links, failed_pages = [], 1
+        # 有分頁失敗的類別仍加入已找到的法規，但不能標記為完成，續跑時重新抓取
+        unit = ('category', category_url)
+        if failed_pages:
+            failed += 1
+        if checkpoint:
+            checkpoint.add_items('law', links, done_unit=None if failed_pages else unit,
+                                 failed_unit=unit if failed_pages else None)
+        found += len(links)
+        yield from links
+    
+    if failed:
+        logging.warning(f"{failed} categories failed; discovery is incomplete and will be retried with --resume")
+    elif checkpoint:
+        checkpoint.mark_complete('discovery')
+    logging.info(f"Found {found} total law URLs in {len(category_links)} categories")
+
+# 法規頁只需要基本資料表格與條文表格
+LAW_PAGE_STRAINER = TargetedStrainer(lambda name, classes, element_id: name == 'table')
+
+def parse_law_content(html, url):
+    """解析單一法規頁面的 HTML"""
+    soup = make_soup(html, LAW_PAGE_STRAINER)
+    
+    # 基本資料表格
+    info_table = soup.select_one("table.table-bordered")
+    
+    law_data = {
+        "LawName": "",
+        "LawCategory": "",
+        "LawModifiedDate": "",
+        "LawArticles": [],
+        "LawURL": url
+    }
+    
+    if info_table:
+        # 取得基本資料
+        rows = info_table.select("tr")
+        for row in rows:
+            th = row.select_one("th")
+            td = row.select_one("td")
+            if not th or not td:
+                continue
+                
+            th_text = th.text.strip()
+            td_text = td.text.strip()
             
-    return all_links
+            if "法規名稱" in th_text:
+                law_data["LawName"] = td_text
+            elif "法規體系" in th_text:
+                law_data["LawCategory"] = td_text
+            elif "公發布日" in th_text:
+                law_data["LawModifiedDate"] = td_text
+    
+    # 取得法規內容
+    content_table = soup.select_one("table.tab-law")
+    if content_table:
+        for row in content_table.select("tr"):
+            td = row.select_one("td:nth-of-type(2)")
+            if td:
+                content = td.text.strip()
+                if content:
+                    law_data["LawArticles"].append({
+                        "ArticleContent": content
+                    })
+    
+    return law_data
 
 def get_law_content(url, session):
-    """解析單一法規內容"""
+    """抓取並解析單一法規內容"""
     try:
-        time.sleep(random.uniform(0.5, 1))
         response = session.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # 基本資料表格
-        info_table = soup.select_one("table.table-bordered")
-        
-        law_data = {
-            "LawName": "",
-            "LawCategory": "",
-            "LawModifiedDate": "",
-            "LawArticles": [],
-            "LawURL": url
-        }
-        
-        if info_table:
-            # 取得基本資料
-            rows = info_table.select("tr")
-            for row in rows:
-                th = row.select_one("th")
-                td = row.select_one("td")
-                if not th or not td:
-                    continue
-                    
-                th_text = th.text.strip()
-                td_text = td.text.strip()
-                
-                if "法規名稱" in th_text:
-                    law_data["LawName"] = td_text
-                elif "法規體系" in th_text:
-                    law_data["LawCategory"] = td_text
-                elif "公發布日" in th_text:
-                    law_data["LawModifiedDate"] = td_text
-        
-        # 取得法規內容
-        content_table = soup.select_one("table.tab-law")
-        if content_table:
-            for row in content_table.select("tr"):
-                td = row.select_one("td:nth-of-type(2)")
-                if td:
-                    content = td.text.strip()
-                    if content:
-                        law_data["LawArticles"].append({
-                            "ArticleContent": content
-                        })
-        
-        return law_data
+        return run_parser(parse_law_content, response.text, url)
+    except Exception as e:
+        logging.error(f"Error processing URL {url}: {e}")
+        return None
+
+async def get_law_content_async(url, fetcher):
+    """以 async 引擎抓取並解析單一法規內容"""
+    try:
+        html = await fetcher.get_text(url)
+        return await fetcher.parse(parse_law_content, html, url)
     except Exception as e:
         logging.error(f"Error processing URL {url}: {e}")
         return None
@@ -154,36 +210,79 @@ def save_json(data, filename):
     """儲存法規資料為JSON檔案"""
     os.makedirs('taichung_law_jsons', exist_ok=True)
     filepath = os.path.join('taichung_law_jsons', filename)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    dump_json(data, filepath)
+
+def save_law(law_data):
+    filename = f"{law_data['LawName']}.json"
+    save_json(law_data, filename)
 
-def main():
+def main(args=None):
+    if args is None:
+        args = parse_args("爬取台中市法規")
+        configure(args)
     base_url = "https://law.taichung.gov.tw/LawCategoryMain.aspx"
     session = get_session()
+    checkpoint = open_checkpoint(args, 'taichung')
     
-    # 獲取所有類別連結
-    category_links = get_categories(session)
-    if not category_links:
-        logging.error("No category links found")
-        return
+    if checkpoint and checkpoint.is_complete('discovery'):
+        total_laws = checkpoint.count_pending('law')
+        all_law_links = checkpoint.iter_pending('law')
+        logging.info(f"Resuming from checkpoint with {total_laws} pending law URLs")
+    else:
+        # 獲取所有類別連結
+        category_links = get_categories(session)
+        if not category_links:
+            logging.error("No category links found")
+            return
         
-    # 獲取所有法規連結
-    all_law_links = []
-    for category_url in tqdm(category_links, desc="Getting category laws"):
-        links = get_law_links_from_page(session, base_url, category_url)
-        all_law_links.extend(links)
+        # 類別頁與法規內容同時抓取，法規總數在探索完成前未知
+        total_laws = None
+        all_law_links = iter_law_links(session, base_url, category_links, args.workers, checkpoint)
     
-    logging.info(f"Found {len(all_law_links)} total law URLs")
+    # 同一部法規可能同時列在多個分類中，排程前依穩定識別碼去除重複
+    frontier = Frontier('taichung')
+    all_law_links = frontier.filter(all_law_links)
+    writer = open_writer(args, 'taichung', 'taichung_law_jsons', save_law)
+    if args.engine == 'async':
+        def on_result(url, law_data):
+            writer.write(law_data)
+            if checkpoint:
+                checkpoint.mark('law', url, 'done')
+        run_async(all_law_links, get_law_content_async, on_result,
+                  headers=dict(session.headers), concurrency=args.concurrency, total=total_laws)
+        writer.close()
+        frontier.log_summary()
+        if checkpoint:
+            checkpoint.finish()
+        return
     
     # 處理所有法規內容
-    with tqdm(total=len(all_law_links), desc="Processing Laws") as pbar:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            for i in range(0, len(all_law_links), 20):
-                batch = all_law_links[i:i+20]
-                futures = [executor.submit(get_law_content, url, session) for url in batch]
-                
-                for future in concurrent.futures.as_completed(futures):
-                    if law_data := future.result():
-                        filename = f"{law_data['LawName']}.json"
-                        save_json(law_data, filename)
-                    pbar.update(1)
+    manifest = open_manifest(args, 'taichung')
+    
+    def process(url):
+        return fetch_if_changed(manifest, url, lambda: head_fingerprint(session, url),
+                                lambda: get_law_content(url, session))
+    
+    stats = Throughput()
+    with window_for(args, "law.taichung.gov.tw") as window, tqdm(total=total_laws, desc="Processing Laws") as pbar:
+        for url, law_data, error in window.imap_unordered(process, all_law_links):
+            if law_data is UNCHANGED:
+                stats.skip()
+            else:
+                if law_data:
+                    writer.write(law_data)
+                stats.record(bool(law_data))
+            if checkpoint:
+                checkpoint.mark('law', url, 'failed' if law_data is None else 'done')
+            pbar.update(1)
+    writer.close()
+    if manifest:
+        manifest.save()
+    if checkpoint:
+        checkpoint.finish()
+    frontier.log_summary()
+    stats.log_summary("thread")
+    log_connection_stats(session)
+
+if __name__ == "__main__":
+    main()
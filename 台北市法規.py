@@ -1,16 +1,20 @@
 from bs4 import BeautifulSoup
-import concurrent.futures
 import requests
-import json
 import os
 from urllib.parse import urljoin
 from tqdm import tqdm
 import logging
-import random
-import time
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import re 
+from lawcrawler.async_fetch import run_async
+from lawcrawler.cli import configure, open_checkpoint, open_manifest, open_writer, parse_args, window_for
+from lawcrawler.frontier import Frontier
+from lawcrawler.manifest import UNCHANGED, fetch_if_changed, head_fingerprint
+from lawcrawler.output import dump_json
+from lawcrawler.pagination import fetch_pages
+from lawcrawler.parsing import TargetedStrainer, make_soup, run_parser
+from lawcrawler.session import CrawlerAdapter, get_many, log_connection_stats
+from lawcrawler.stats import Throughput
 
 logging.basicConfig(
    level=logging.INFO,
@@ -30,92 +34,145 @@ HEADERS = {
 def get_session():
    session = requests.Session()
    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-   adapter = HTTPAdapter(max_retries=retry)
+   adapter = CrawlerAdapter(max_retries=retry)
    session.mount('http://', adapter)
    session.mount('https://', adapter)
    session.headers.update(HEADERS)
    return session
 
 def get_total_pages(session):
+   """取得列表總頁數；失敗時拋出例外，不能當成零頁"""
+   response = session.get("https://www.laws.taipei.gov.tw/Law/LawCategory/LawCategoryResult?categoryid=001&page=1")
+   soup = BeautifulSoup(response.text, 'html.parser')
+   total_pages = int(soup.select_one("div.paging-counts em:nth-of-type(2)").text)
+   logging.info(f"Total pages: {total_pages}")
+   return total_pages
+
+def parse_law_urls(html):
+   soup = BeautifulSoup(html, 'html.parser')
+   urls = []
+   for link in soup.select("table.table-tab td a"):
+       if 'href' in link.attrs:
+           law_url = urljoin("https://www.laws.taipei.gov.tw", link['href'])
+           urls.append(law_url)
+   return urls
+
+def iter_law_urls(session, checkpoint=None, workers=5):
+   """並行抓取所有分頁，法規網址一發現就產出，讓內容抓取與探索同時進行"""
+   if checkpoint:
+       # 上次中斷前已發現、尚未完成的法規先交給內容抓取階段
+       yield from checkpoint.iter_pending('law')
    try:
-       response = session.get("https://www.laws.taipei.gov.tw/Law/LawCategory/LawCategoryResult?categoryid=001&page=1")
-       soup = BeautifulSoup(response.text, 'html.parser')
-       total_pages = int(soup.select_one("div.paging-counts em:nth-of-type(2)").text)
-       logging.info(f"Total pages: {total_pages}")
-       return total_pages
+       total_pages = get_total_pages(session)
    except Exception as e:
+       # 不知道有幾頁就無法確認探索完整，不標記探索完成，續跑時重新探索
        logging.error(f"Error getting total pages: {e}")
-       return 0
+       return
+   
+   def fetch_page(page):
+       response = session.get(f"https://www.laws.taipei.gov.tw/Law/LawCategory/LawCategoryResult?categoryid=001&page={page}")
+       return parse_law_urls(response.text)
+   
+   # 總頁數已知，直接並行抓取所有分頁；續跑時略過已完成的分頁
+   pages = [page for page in range(1, total_pages + 1)
+            if not (checkpoint and checkpoint.is_done('page', str(page)))]
+   found = 0
+   failed = 0
+   for page, page_urls, error in fetch_pages(fetch_page, pages, workers):
+       if error:
+           failed += 1
+           if checkpoint:
+               checkpoint.mark('page', str(page), 'failed')
+           continue
+       if checkpoint:
+           checkpoint.add_items('law', page_urls, done_unit=('page', str(page)))
+       found += len(page_urls)
+       yield from page_urls
+   
+   if failed:
+       logging.warning(f"{failed} pages failed; discovery is incomplete and will be retried with --resume")
+   elif checkpoint:
+       checkpoint.mark_complete('discovery')
+   logging.info(f"Found {found} law URLs on {total_pages} pages")
 
-def get_law_urls(session):
-   urls = []
-   total_pages = get_total_pages(session)
+# 基本資料頁只需要欄位標籤與欄位值，條文頁只需要條文清單
+INFO_PAGE_STRAINER = TargetedStrainer(lambda name, classes, element_id: 'col-label' in classes or 'col-input' in classes)
+CONTENT_PAGE_STRAINER = TargetedStrainer(lambda name, classes, element_id: name == 'ul' and 'law-content' in classes)
+
+def parse_law_info(html, content_url):
+   soup = make_soup(html, INFO_PAGE_STRAINER)
    
-   with tqdm(total=total_pages, desc="Collecting URLs") as pbar:
-       for page in range(1, total_pages + 1):
-           try:
-               time.sleep(random.uniform(1, 2))
-               response = session.get(f"https://www.laws.taipei.gov.tw/Law/LawCategory/LawCategoryResult?categoryid=001&page={page}")
-               soup = BeautifulSoup(response.text, 'html.parser')
-               
-               for link in soup.select("table.table-tab td a"):
-                   if 'href' in link.attrs:
-                       law_url = urljoin("https://www.laws.taipei.gov.tw", link['href'])
-                       urls.append(law_url)
-               pbar.update(1)
-           except Exception as e:
-               logging.error(f"Error on page {page}: {e}")
+   return {
+       "LawName": soup.select_one("div.col-input a.law-link").text.strip() if soup.select_one("div.col-input a.law-link") else "",
+       "LawModifiedDate": soup.select_one("div.col-label:contains('修正日期') + div.col-input dfn").text.strip() if soup.select_one("div.col-label:contains('修正日期') + div.col-input dfn") else "",
+       "LawArticles": [],
+       "LawURL": content_url
+   }
+
+def parse_law_articles(html, law_data):
+   soup = make_soup(html, CONTENT_PAGE_STRAINER)
    
-   logging.info(f"Found {len(urls)} law URLs")
-   return urls
+   articles = soup.select("ul.law.law-content li")
+   chapter = ""
+   
+   for article in articles:
+       # 處理章節標題
+       if article.select_one("div.law-articlepre") is None and article.text.strip():
+           chapter = article.text.strip()
+           continue
+           
+       content_div = article.select_one("div.law-articlepre")
+       if content_div:
+           content = content_div.text.strip()
+           
+           # 檢查是否為點號形式(如 "一、") 或條號形式(如 "第1條")
+           if re.match(r'^[一二三四五六七八九十]+、', content):
+               number = content.split('、')[0] + '、'
+               content = content[len(number):].strip()
+           else:
+               number_div = article.select_one("div.col-no")
+               number = number_div.text.strip() if number_div else ""
+           
+           if content:
+               law_data["LawArticles"].append({
+                   "Chapter": chapter,
+                   "ArticleNo": number,
+                   "ArticleContent": content
+               })
+   return law_data
+
+def law_page_urls(url):
+   fl_code = url.split('/FL')[1].split('?')[0]
+   info_url = f"https://www.laws.taipei.gov.tw/Law/LawSearch/LawInformation/FL{fl_code}"
+   content_url = f"https://www.laws.taipei.gov.tw/Law/LawSearch/LawArticleContent/FL{fl_code}"
+   return info_url, content_url
 
 def get_law_json(url, session):
    try:
-       fl_code = url.split('/FL')[1].split('?')[0]
-       info_url = f"https://www.laws.taipei.gov.tw/Law/LawSearch/LawInformation/FL{fl_code}"
-       content_url = f"https://www.laws.taipei.gov.tw/Law/LawSearch/LawArticleContent/FL{fl_code}"
-       
-       response = session.get(info_url)
-       soup = BeautifulSoup(response.text, 'html.parser')
+       info_url, content_url = law_page_urls(url)
        
-       law_data = {
-           "LawName": soup.select_one("div.col-input a.law-link").text.strip() if soup.select_one("div.col-input a.law-link") else "",
-           "LawModifiedDate": soup.select_one("div.col-label:contains('修正日期') + div.col-input dfn").text.strip() if soup.select_one("div.col-label:contains('修正日期') + div.col-input dfn") else "",
-           "LawArticles": [],
-           "LawURL": content_url
-       }
+       # 資訊頁與條文頁同時抓取
+       info_response, content_response = get_many(session, [info_url, content_url])
+       law_data = run_parser(parse_law_info, info_response.text, content_url)
+       law_data = run_parser(parse_law_articles, content_response.text, law_data)
        
-       time.sleep(random.uniform(1, 2))
-       response = session.get(content_url)
-       soup = BeautifulSoup(response.text, 'html.parser')
-       
-       articles = soup.select("ul.law.law-content li")
-       chapter = ""
+       if not law_data["LawName"]:
+           logging.error(f"No law name found for URL: {content_url}")
+           return None
+           
+       return law_data
+   except Exception as e:
+       logging.error(f"Failed URL: {url}")
+       logging.error(f"Error: {str(e)}")
+       return None
+
+async def get_law_json_async(url, fetcher):
+   try:
+       info_url, content_url = law_page_urls(url)
        
-       for article in articles:
-           # 處理章節標題
-           if article.select_one("div.law-articlepre") is None and article.text.strip():
-               chapter = article.text.strip()
-               continue
-               
-           content_div = article.select_one("div.law-articlepre")
-           if content_div:
-               content = content_div.text.strip()
-               
-               # 檢查是否為點號形式(如 "一、") 或條號形式(如 "第1條")
-               if re.match(r'^[一二三四五六七八九十]+、', content):
-                   number = content.split('、')[0] + '、'
-                   content = content[len(number):].strip()
-               else:
-                   number_div = article.select_one("div.col-no")
-                   number = number_div.text.strip() if number_div else ""
-               
-               if content:
-                   law_data["LawArticles"].append({
-                       "Chapter": chapter,
-                       "ArticleNo": number,
-                       "ArticleContent": content
-                   })
+       info_html, content_html = await fetcher.get_many_text([info_url, content_url])
+       law_data = await fetcher.parse(parse_law_info, info_html, content_url)
+       law_data = await fetcher.parse(parse_law_articles, content_html, law_data)
        
        if not law_data["LawName"]:
            logging.error(f"No law name found for URL: {content_url}")
@@ -130,34 +187,77 @@ def get_law_json(url, session):
 def save_json(data, filename):
    os.makedirs('taipei_law_jsons', exist_ok=True)
    filepath = os.path.join('taipei_law_jsons', filename)
-   with open(filepath, 'w', encoding='utf-8') as f:
-       json.dump(data, f, ensure_ascii=False, indent=2)
+   dump_json(data, filepath)
 
-def main():
+def save_law(law_data):
+   filename = f"{law_data['LawName']}.json"
+   save_json(law_data, filename)
+
+def main(args=None):
+   if args is None:
+       args = parse_args("爬取台北市法規")
+       configure(args)
    session = get_session()
-   law_urls = get_law_urls(session)
+   checkpoint = open_checkpoint(args, 'taipei')
    
-   if not law_urls:
-       logging.error("No law URLs found")
+   if checkpoint and checkpoint.is_complete('discovery'):
+       total_laws = checkpoint.count_pending('law')
+       law_urls = checkpoint.iter_pending('law')
+       logging.info(f"Resuming from checkpoint with {total_laws} pending law URLs")
+   else:
+       total_laws = None
+       law_urls = iter_law_urls(session, checkpoint, args.workers)
+       
+   # 各分頁並行抓取，期間有法規增減時列表位移，同一部法規可能出現在兩頁中；排程前依 FL 編號去除重複
+   frontier = Frontier('taipei', requests_per_item=2)
+   law_urls = frontier.filter(law_urls)
+   writer = open_writer(args, 'taipei', 'taipei_law_jsons', save_law)
+   if args.engine == 'async':
+       def on_result(url, law_data):
+           writer.write(law_data)
+           if checkpoint:
+               checkpoint.mark('law', url, 'done')
+       run_async(law_urls, get_law_json_async, on_result,
+                 headers=HEADERS, concurrency=args.concurrency, total=total_laws)
+       writer.close()
+       frontier.log_summary()
+       if checkpoint:
+           checkpoint.finish()
        return
        
    processed_count = 0
-   with tqdm(total=len(law_urls), desc="Processing Laws") as pbar:
-       for i in range(0, len(law_urls), 20):
-           batch = law_urls[i:i+20]
-           with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-               futures = [executor.submit(get_law_json, url, session) for url in batch]
-               
-               for future in concurrent.futures.as_completed(futures):
-                   try:
-                       law_data = future.result()
-                       if law_data and law_data["LawName"]:
-                           filename = f"{law_data['LawName']}.json"
-                           save_json(law_data, filename)
-                           processed_count += 1
-                   except Exception as e:
-                       logging.error(f"Error processing law: {e}")
-                   pbar.update(1)
+   manifest = open_manifest(args, 'taipei')
+   
+   def process(url):
+       return fetch_if_changed(manifest, url, lambda: head_fingerprint(session, law_page_urls(url)[1]),
+                               lambda: get_law_json(url, session))
+   
+   stats = Throughput()
+   with window_for(args, "www.laws.taipei.gov.tw") as window, tqdm(total=total_laws, desc="Processing Laws") as pbar:
+       for url, law_data, error in window.imap_unordered(process, law_urls):
+           if checkpoint:
+               checkpoint.mark('law', url, 'failed' if law_data is None else 'done')
+           if law_data is UNCHANGED:
+               stats.skip()
+               pbar.update(1)
+               continue
+           if error:
+               logging.error(f"Error processing law: {error}")
+           elif law_data and law_data["LawName"]:
+               writer.write(law_data)
+               processed_count += 1
+           stats.record(bool(law_data))
+           pbar.update(1)
    
-   logging.info(f"Completed! Successfully processed {processed_count} out of {len(law_urls)} laws")
+   writer.close()
+   if manifest:
+       manifest.save()
+   if checkpoint:
+       checkpoint.finish()
+   logging.info(f"Completed! Successfully processed {processed_count} laws")
+   frontier.log_summary()
+   stats.log_summary("thread")
+   log_connection_stats(session)
 
+if __name__ == "__main__":
+   main()
@@ -1,16 +1,20 @@
 
-import concurrent.futures
 import requests
-import json
 import os
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from tqdm import tqdm
 import logging
-import random
-import time
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from lawcrawler.async_fetch import run_async
+from lawcrawler.cli import configure, open_checkpoint, open_manifest, open_writer, parse_args, window_for
+from lawcrawler.endpoints import EndpointMemory
+from lawcrawler.frontier import Frontier
+from lawcrawler.manifest import UNCHANGED, fetch_if_changed, head_fingerprint
+from lawcrawler.output import dump_json
+from lawcrawler.parsing import TargetedStrainer, make_soup, run_parser
+from lawcrawler.session import CrawlerAdapter, get_many, log_connection_stats
+from lawcrawler.stats import Throughput
 
 logging.basicConfig(
    level=logging.INFO,
@@ -24,7 +28,7 @@ logging.basicConfig(
 def get_session():
    session = requests.Session()
    retry = Retry(total=3, backoff_factor=0.5)
-   adapter = HTTPAdapter(max_retries=retry)
+   adapter = CrawlerAdapter(max_retries=retry)
    session.mount('http://', adapter)
    session.mount('https://', adapter)
    session.headers.update({
@@ -34,115 +38,267 @@ def get_session():
    return session
 
 def get_law_links_from_category(session, category_url, base_url="https://web.law.ntpc.gov.tw/"):
+   """抓取類別頁的法規代碼；失敗時拋出例外，由呼叫端把該類別標記為失敗"""
    laws = []
-   try:
-       response = session.get(category_url)
-       soup = BeautifulSoup(response.text, 'html.parser')
+   response = session.get(category_url)
+   soup = BeautifulSoup(response.text, 'html.parser')
+   
+   # 從表格中找到所有法規連結
+   for link in soup.select("table.tab-list a[href*='FLAWDAT01.aspx']"):
+       if not link.find_previous("img", src="/images/fei.gif"):
+           href = link.get('href', '')
+           lncode = href.split('lncode=')[1]  # 直接從href取得lncode
+           fcode = lncode.replace('1C', 'C')  # 轉換成fcode格式
+           title = link.text.strip()
+           
+           laws.append({
+               'title': title,
+               'fcode': fcode
+           })
+           
+   return laws
+
+def get_categories(session, base_url="https://web.law.ntpc.gov.tw/Level.aspx"):
+   response = session.get(base_url)
+   soup = BeautifulSoup(response.text, 'html.parser')
+   categories = []
+   for link in soup.select("ul.level a[href*='Query2.aspx?no=C']"):
+       href = link.get('href', '')
+       full_url = urljoin(base_url, href)
+       categories.append(full_url)
+   return categories
+
+def iter_laws(session, categories, checkpoint=None):
+   """逐一抓取各類別的法規代碼，一發現就產出，讓內容抓取與探索同時進行"""
+   if checkpoint:
+       # 上次中斷前已發現、尚未完成的法規先交給內容抓取階段
+       yield from checkpoint.iter_pending('law')
+   
+   found = 0
+   failed = 0
+   for cat_url in categories:
+       # 續跑時略過已完成的類別
+       if checkpoint and checkpoint.is_done('category', cat_url):
+           continue
+       try:
+           laws = get_law_links_from_category(session, cat_url)
+       except Exception as e:
+           # 失敗的類別不能標記為完成，否則續跑時不會再抓
+           logging.error(f"抓取類別頁面 {cat_url} 時發生錯誤: {e}")
+           failed += 1
+           if checkpoint:
+               checkpoint.mark('category', cat_url, 'failed')
+           continue
+       if checkpoint:
+           checkpoint.add_items('law', laws, key=lambda law: law['fcode'], done_unit=('category', cat_url))
+       found += len(laws)
+       yield from laws
+   
+   if failed:
+       logging.warning(f"{failed} 個類別抓取失敗，探索未完成，可用 --resume 重試")
+   elif checkpoint:
+       checkpoint.mark_complete('discovery')
+   logging.info(f"成功取得 {found} 個法規代碼（{len(categories)} 個類別）")
+
+# 法規頁只需要條文表格與標題（含修正日期）
+LAW_PAGE_STRAINER = TargetedStrainer(lambda name, classes, element_id: name == 'table' or element_id == 'cph_content_lawheader_law')
+
+def parse_law_content(html, law_info):
+   soup = make_soup(html, LAW_PAGE_STRAINER)
+   
+   # 檢查是否包含法規內容
+   if not soup.select("table.tab-law01 tr") and not soup.select("table.tab-law tr"):
+       return None
        
-       # 從表格中找到所有法規連結
-       for link in soup.select("table.tab-list a[href*='FLAWDAT01.aspx']"):
-           if not link.find_previous("img", src="/images/fei.gif"):
-               href = link.get('href', '')
-               lncode = href.split('lncode=')[1]  # 直接從href取得lncode
-               fcode = lncode.replace('1C', 'C')  # 轉換成fcode格式
-               title = link.text.strip()
-               
-               laws.append({
-                   'title': title,
-                   'fcode': fcode
-               })
-               
-       time.sleep(0.5)
-       return laws
-   except Exception as e:
-       logging.error(f"抓取類別頁面 {category_url} 時發生錯誤: {e}")
-       return []
+   law_data = {
+       "LawName": law_info['title'],
+       "LastModified": "",
+       "Articles": []
+   }
+
+   header = soup.select_one("#cph_content_lawheader_law")
+   if header:
+       date_text = header.text.split('(')[1].split(')')[0].strip()
+       law_data["LastModified"] = date_text
+
+   # 嘗試兩種可能的table class
+   articles = soup.select("table.tab-law01 tr") or soup.select("table.tab-law tr")
+   for row in articles:
+       num = row.select_one(".col-th")
+       content = row.select_one(".col-td pre")
+       if num and content:
+           law_data["Articles"].append({
+               "Number": num.text.strip(),
+               "Content": content.text.strip()
+           })
+
+   return law_data if law_data["Articles"] else None
 
 def try_get_content(url, law_info, session):
    try:
        response = session.get(url)
-       soup = BeautifulSoup(response.text, 'html.parser')
-       
-       # 檢查是否包含法規內容
-       if not soup.select("table.tab-law01 tr") and not soup.select("table.tab-law tr"):
-           return None
-           
-       law_data = {
-           "LawName": law_info['title'],
-           "LastModified": "",
-           "Articles": []
-       }
-
-       header = soup.select_one("#cph_content_lawheader_law")
-       if header:
-           date_text = header.text.split('(')[1].split(')')[0].strip()
-           law_data["LastModified"] = date_text
-
-       # 嘗試兩種可能的table class
-       articles = soup.select("table.tab-law01 tr") or soup.select("table.tab-law tr")
-       for row in articles:
-           num = row.select_one(".col-th")
-           content = row.select_one(".col-td pre")
-           if num and content:
-               law_data["Articles"].append({
-                   "Number": num.text.strip(),
-                   "Content": content.text.strip()
-               })
-
-       return law_data if law_data["Articles"] else None
-       
+       return run_parser(parse_law_content, response.text, law_info)
    except Exception as e:
        logging.error(f"處理法規 {law_info['title']} 內容時發生錯誤: {e}")
        return None
 
-def get_law_content(law_info, session):
-   # 先嘗試0202
-   url = f"https://web.law.ntpc.gov.tw/Scripts/FLAWDAT0202.aspx?fcode={law_info['fcode']}"
-   content = try_get_content(url, law_info, session)
-   
-   # 若0202失敗則嘗試0201
-   if not content:
-       url = f"https://web.law.ntpc.gov.tw/Scripts/FLAWDAT0201.aspx?fcode={law_info['fcode']}"
-       content = try_get_content(url, law_info, session)
-       
-   return content
+async def try_get_content_async(url, law_info, fetcher):
+   try:
+       html = await fetcher.get_text(url)
+       return await fetcher.parse(parse_law_content, html, law_info)
+   except Exception as e:
+       logging.error(f"處理法規 {law_info['title']} 內容時發生錯誤: {e}")
+       return None
+
+# 法規內容分散在兩個端點，沒有紀錄時先嘗試0202，若0202失敗則嘗試0201
+ENDPOINT_URLS = {
+   '0202': "https://web.law.ntpc.gov.tw/Scripts/FLAWDAT0202.aspx?fcode={fcode}",
+   '0201': "https://web.law.ntpc.gov.tw/Scripts/FLAWDAT0201.aspx?fcode={fcode}",
+}
+
+def content_urls(law_info, endpoints=None):
+   """依端點記憶排列要嘗試的 (端點, 網址)"""
+   order = endpoints.order(law_info['fcode']) if endpoints else list(ENDPOINT_URLS)
+   return [(name, ENDPOINT_URLS[name].format(fcode=law_info['fcode'])) for name in order]
+
+def should_race(law_info, endpoints, race):
+   """沒有紀錄也無法由前綴預測的法規，才同時請求兩個端點"""
+   return race and endpoints is not None and endpoints.predict(law_info['fcode'])[0] is None
+
+def record_endpoint(law_info, endpoints, name, requests):
+   if endpoints is None:
+       return
+   if name:
+       endpoints.record(law_info['fcode'], name, requests)
+   else:
+       endpoints.record_failure(requests)
+
+def get_law_content(law_info, session, endpoints=None, race=False):
+   candidates = content_urls(law_info, endpoints)
+   if should_race(law_info, endpoints, race):
+       try:
+           responses = get_many(session, [url for _, url in candidates])
+       except Exception as e:
+           logging.warning(f"同時請求法規 {law_info['title']} 的端點失敗，改為依序嘗試: {e}")
+       else:
+           for (name, _), response in zip(candidates, responses):
+               try:
+                   content = run_parser(parse_law_content, response.text, law_info)
+               except Exception as e:
+                   # 單一端點的頁面無法解析時，繼續檢查另一個端點的回應
+                   logging.error(f"解析法規 {law_info['title']} 的 {name} 端點內容時發生錯誤: {e}")
+                   continue
+               if content:
+                   record_endpoint(law_info, endpoints, name, len(candidates))
+                   return content
+           record_endpoint(law_info, endpoints, None, len(candidates))
+           return None
+   for attempt, (name, url) in enumerate(candidates, 1):
+       if content := try_get_content(url, law_info, session):
+           record_endpoint(law_info, endpoints, name, attempt)
+           return content
+   record_endpoint(law_info, endpoints, None, len(candidates))
+   return None
+
+async def get_law_content_async(law_info, fetcher, endpoints=None, race=False):
+   candidates = content_urls(law_info, endpoints)
+   if should_race(law_info, endpoints, race):
+       try:
+           pages = await fetcher.get_many_text([url for _, url in candidates])
+       except Exception as e:
+           logging.warning(f"同時請求法規 {law_info['title']} 的端點失敗，改為依序嘗試: {e}")
+       else:
+           for (name, _), html in zip(candidates, pages):
+               try:
+                   content = await fetcher.parse(parse_law_content, html, law_info)
+               except Exception as e:
+                   # 單一端點的頁面無法解析時，繼續檢查另一個端點的回應
+                   logging.error(f"解析法規 {law_info['title']} 的 {name} 端點內容時發生錯誤: {e}")
+                   continue
+               if content:
+                   record_endpoint(law_info, endpoints, name, len(candidates))
+                   return content
+           record_endpoint(law_info, endpoints, None, len(candidates))
+           return None
+   for attempt, (name, url) in enumerate(candidates, 1):
+       if content := await try_get_content_async(url, law_info, fetcher):
+           record_endpoint(law_info, endpoints, name, attempt)
+           return content
+   record_endpoint(law_info, endpoints, None, len(candidates))
+   return None
+
+def save_law(law_data):
+   filename = f"{law_data['LawName']}.json"
+   filepath = os.path.join('ntpc_law_jsons', filename)
+   dump_json(law_data, filepath)
    
-def main():
+def main(args=None):
+   if args is None:
+       args = parse_args("爬取新北市法規")
+       configure(args)
    session = get_session()
-   base_url = "https://web.law.ntpc.gov.tw/Level.aspx"
+   checkpoint = open_checkpoint(args, 'ntpc')
 
-   # 獲取類別列表
-   response = session.get(base_url)
-   soup = BeautifulSoup(response.text, 'html.parser')
-   categories = []
-   for link in soup.select("ul.level a[href*='Query2.aspx?no=C']"):
-       href = link.get('href', '')
-       full_url = urljoin(base_url, href)
-       categories.append(full_url)
-
-   # 獲取所有法規連結
-   all_laws = []
-   for cat_url in tqdm(categories, desc="正在抓取類別"):
-       laws = get_law_links_from_category(session, cat_url)
-       all_laws.extend(laws)
-       
-   logging.info(f"成功取得 {len(all_laws)} 個法規代碼")
+   if checkpoint and checkpoint.is_complete('discovery'):
+       total_laws = checkpoint.count_pending('law')
+       all_laws = checkpoint.iter_pending('law')
+       logging.info(f"從檢查點繼續，剩餘 {total_laws} 個法規")
+   else:
+       # 類別頁與法規內容同時抓取，法規總數在探索完成前未知
+       total_laws = None
+       all_laws = iter_laws(session, get_categories(session), checkpoint)
    
    # 處理法規內容
    os.makedirs('ntpc_law_jsons', exist_ok=True)
-   with tqdm(total=len(all_laws), desc="正在處理法規內容") as pbar:
-       with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-           for i in range(0, len(all_laws), 10):
-               batch = all_laws[i:i+10]
-               futures = [executor.submit(get_law_content, law, session) for law in batch]
-               
-               for future in concurrent.futures.as_completed(futures):
-                   if law_data := future.result():
-                       filename = f"{law_data['LawName']}.json"
-                       filepath = os.path.join('ntpc_law_jsons', filename)
-                       with open(filepath, 'w', encoding='utf-8') as f:
-                           json.dump(law_data, f, ensure_ascii=False, indent=2)
-                   pbar.update(1)
+   # 同一部法規可能同時列在多個類別中，排程前依 fcode 去除重複
+   frontier = Frontier('ntpc')
+   all_laws = frontier.filter(all_laws)
+   writer = open_writer(args, 'ntpc', 'ntpc_law_jsons', save_law)
+   # 記住每部法規可用的端點，下次直接請求正確的端點
+   endpoints = EndpointMemory(os.path.join(args.manifest_dir, 'ntpc_endpoints.json'), ENDPOINT_URLS)
+   if args.engine == 'async':
+       def on_result(law, law_data):
+           writer.write(law_data)
+           if checkpoint:
+               checkpoint.mark('law', law['fcode'], 'done')
+       run_async(all_laws, lambda law, fetcher: get_law_content_async(law, fetcher, endpoints, args.race_endpoints),
+                 on_result, headers=dict(session.headers), concurrency=args.concurrency, total=total_laws)
+       writer.close()
+       frontier.log_summary()
+       endpoints.save()
+       endpoints.log_summary('ntpc')
+       if checkpoint:
+           checkpoint.finish()
+       return
+
+   manifest = open_manifest(args, 'ntpc')
+   
+   def process(law):
+       return fetch_if_changed(manifest, law['fcode'], lambda: head_fingerprint(session, content_urls(law, endpoints)[0][1]),
+                               lambda: get_law_content(law, session, endpoints, args.race_endpoints))
+   
+   stats = Throughput()
+   with window_for(args, "web.law.ntpc.gov.tw") as window, tqdm(total=total_laws, desc="正在處理法規內容") as pbar:
+       for law, law_data, error in window.imap_unordered(process, all_laws):
+           if law_data is UNCHANGED:
+               stats.skip()
+           else:
+               if law_data:
+                   writer.write(law_data)
+               stats.record(bool(law_data))
+           if checkpoint:
+               checkpoint.mark('law', law['fcode'], 'failed' if law_data is None else 'done')
+           pbar.update(1)
+   writer.close()
+   endpoints.save()
+   endpoints.log_summary('ntpc')
+   if manifest:
+       manifest.save()
+   if checkpoint:
+       checkpoint.finish()
+   frontier.log_summary()
+   stats.log_summary("thread")
+   log_connection_stats(session)
 
 if __name__ == "__main__":
-   main()
\ No newline at end of file
+   main()
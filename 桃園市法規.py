@@ -1,15 +1,19 @@
-import concurrent.futures
 import requests
-import json
 import os
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from tqdm import tqdm
 import logging
-import random
-import time
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from lawcrawler.async_fetch import run_async
+from lawcrawler.cli import configure, open_checkpoint, open_manifest, open_writer, parse_args, window_for
+from lawcrawler.frontier import Frontier
+from lawcrawler.manifest import UNCHANGED, fetch_if_changed
+from lawcrawler.output import dump_json
+from lawcrawler.parsing import TargetedStrainer, make_soup, run_parser
+from lawcrawler.result_list import iter_law_links
+from lawcrawler.session import CrawlerAdapter, log_connection_stats
+from lawcrawler.stats import Throughput
 
 # 設置日誌
 logging.basicConfig(
@@ -25,7 +29,7 @@ def get_session():
     """建立一個具有重試機制的請求會話"""
     session = requests.Session()
     retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = CrawlerAdapter(max_retries=retry)
     session.mount('http://', adapter)
     session.mount('https://', adapter)
     session.headers.update({
@@ -61,143 +65,94 @@ def get_all_laws_url(session, base_url="https://law.tycg.gov.tw/"):
         logging.error(f"Error getting all laws URL: {e}")
         return None, 0
 
-def get_law_links_from_page(session, url, base_url="https://law.tycg.gov.tw/"):
-    """從單一頁面獲取所有法規連結"""
-    try:
-        response = session.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        law_links = []
-        
-        # 獲取當前頁面的所有法規連結
-        rows = soup.select("table.table-hover tr")
-        for row in rows:
-            # 跳過已廢止的法規
-            if row.select_one(".label-fei"):
-                continue
-            
-            link = row.select_one("a[href*='LawContent.aspx']")
-            if link and link.get('href'):
-                full_url = urljoin(base_url, link['href'])
-                date_td = row.select_one("td:nth-of-type(2)")
-                date = date_td.text.strip() if date_td else ""
-                
-                law_links.append({
-                    'url': full_url,
-                    'name': link.text.strip(),
-                    'date': date
-                })
-        
-        # 查找下一頁連結
-        next_page = soup.select_one("a#ctl00_cp_content_rptList_ctl11_PagerButtom_hlNext")
-        next_page_url = None
-        if next_page and 'disabled' not in next_page.get('class', []) and next_page.get('href'):
-            next_page_url = urljoin(base_url, next_page['href'])
-        
-        return law_links, next_page_url
-    except Exception as e:
-        logging.error(f"Error getting laws from page {url}: {e}")
-        return [], None
+# 法規頁只需要資料表格與無表格時的內文區塊
+LAW_PAGE_STRAINER = TargetedStrainer(lambda name, classes, element_id: name == 'table' or 'law-reg-content' in classes)
 
-def get_all_law_links(session, start_url, base_url="https://law.tycg.gov.tw/", total_laws=0):
-    """抓取所有頁面的法規連結"""
-    all_links = []
-    current_url = start_url
-    page = 1
+def parse_law_content(html, law_info):
+    """解析單一法規內容頁面的 HTML"""
+    soup = make_soup(html, LAW_PAGE_STRAINER)
+    
+    law_data = {
+        "LawName": law_info['name'],
+        "LawURL": law_info['url'],
+        "LawDate": law_info.get('date', ''),
+        "LawType": "",
+        "LawCategory": "",
+        "LawPublishDate": "",
+        "LawModifiedDate": "",
+        "LawArticles": []
+    }
     
-    with tqdm(total=total_laws, desc="Finding laws") as pbar:
-        while current_url:
-            logging.info(f"Processing page {page}: {current_url}")
-            links, next_url = get_law_links_from_page(session, current_url, base_url)
-            all_links.extend(links)
+    # 獲取法規基本資訊
+    info_table = soup.select_one("table.table-bordered")
+    if info_table:
+        for row in info_table.select("tr"):
+            th = row.select_one("th")
+            td = row.select_one("td")
+            if not th or not td:
+                continue
             
-            # 更新進度條
-            pbar.update(len(links))
-            pbar.set_description(f"Finding laws (Page {page})")
+            field_name = th.text.strip()
+            field_value = td.text.strip()
             
-            if not next_url:
-                break
-                
-            current_url = next_url
-            page += 1
-            time.sleep(random.uniform(0.5, 1.5))  # 避免請求過快
+            if "法規名稱" in field_name:
+                law_data["LawName"] = field_value
+            elif "法規體系" in field_name:
+                law_data["LawCategory"] = field_value
+            elif "公發布日" in field_name:
+                law_data["LawPublishDate"] = field_value
+            elif "修正日期" in field_name:
+                law_data["LawModifiedDate"] = field_value
+            elif "發文字號" in field_name:
+                law_data["LawNumber"] = field_value
     
-    logging.info(f"Found total {len(all_links)} laws from {page} pages")
-    return all_links
-
-def get_law_content(law_info, session):
-    """解析單一法規內容頁面"""
-    try:
-        time.sleep(random.uniform(0.5, 1))
-        response = session.get(law_info['url'])
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        law_data = {
-            "LawName": law_info['name'],
-            "LawURL": law_info['url'],
-            "LawDate": law_info.get('date', ''),
-            "LawType": "",
-            "LawCategory": "",
-            "LawPublishDate": "",
-            "LawModifiedDate": "",
-            "LawArticles": []
-        }
-        
-        # 獲取法規基本資訊
-        info_table = soup.select_one("table.table-bordered")
-        if info_table:
-            for row in info_table.select("tr"):
-                th = row.select_one("th")
-                td = row.select_one("td")
-                if not th or not td:
-                    continue
+    # 獲取法規條文內容
+    law_content_table = soup.select_one("table.tab-law")
+    if law_content_table:
+        for row in law_content_table.select("tr"):
+            cols = row.select("td")
+            if len(cols) >= 2:
+                article_number = cols[0].text.strip()
+                article_content = cols[1].text.strip()
                 
-                field_name = th.text.strip()
-                field_value = td.text.strip()
-                
-                if "法規名稱" in field_name:
-                    law_data["LawName"] = field_value
-                elif "法規體系" in field_name:
-                    law_data["LawCategory"] = field_value
-                elif "公發布日" in field_name:
-                    law_data["LawPublishDate"] = field_value
-                elif "修正日期" in field_name:
-                    law_data["LawModifiedDate"] = field_value
-                elif "發文字號" in field_name:
-                    law_data["LawNumber"] = field_value
-        
-        # 獲取法規條文內容
-        law_content_table = soup.select_one("table.tab-law")
-        if law_content_table:
-            for row in law_content_table.select("tr"):
-                cols = row.select("td")
-                if len(cols) >= 2:
-                    article_number = cols[0].text.strip()
-                    article_content = cols[1].text.strip()
-                    
-                    if article_content:
-                        law_data["LawArticles"].append({
-                            "ArticleNumber": article_number,
-                            "ArticleContent": article_content
-                        })
-                elif len(cols) == 1 and "章" in cols[0].text:
-                    # 這是章節標題
-                    chapter_title = cols[0].text.strip()
+                if article_content:
                     law_data["LawArticles"].append({
-                        "ArticleNumber": "章節",
-                        "ArticleContent": chapter_title
+                        "ArticleNumber": article_number,
+                        "ArticleContent": article_content
                     })
-        
-        # 如果沒有找到條文表格，嘗試從其他地方獲取內容
-        if not law_data["LawArticles"]:
-            content_div = soup.select_one(".law-reg-content")
-            if content_div:
+            elif len(cols) == 1 and "章" in cols[0].text:
+                # 這是章節標題
+                chapter_title = cols[0].text.strip()
                 law_data["LawArticles"].append({
-                    "ArticleNumber": "",
-                    "ArticleContent": content_div.text.strip()
+                    "ArticleNumber": "章節",
+                    "ArticleContent": chapter_title
                 })
-        
-        return law_data
+    
+    # 如果沒有找到條文表格，嘗試從其他地方獲取內容
+    if not law_data["LawArticles"]:
+        content_div = soup.select_one(".law-reg-content")
+        if content_div:
+            law_data["LawArticles"].append({
+                "ArticleNumber": "",
+                "ArticleContent": content_div.text.strip()
+            })
+    
+    return law_data
+
+def get_law_content(law_info, session):
+    """抓取並解析單一法規內容頁面"""
+    try:
+        response = session.get(law_info['url'])
+        return run_parser(parse_law_content, response.text, law_info)
+    except Exception as e:
+        logging.error(f"Error processing law {law_info['name']}: {e}")
+        return None
+
+async def get_law_content_async(law_info, fetcher):
+    """以 async 引擎抓取並解析單一法規內容頁面"""
+    try:
+        html = await fetcher.get_text(law_info['url'])
+        return await fetcher.parse(parse_law_content, html, law_info)
     except Exception as e:
         logging.error(f"Error processing law {law_info['name']}: {e}")
         return None
@@ -211,58 +166,96 @@ def save_json(data, filename):
         safe_filename = f"law_{hash(filename) % 10000}"
     
     filepath = os.path.join('taoyuan_law_jsons', f"{safe_filename}.json")
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    dump_json(data, filepath)
     return filepath
 
-def main():
+def save_law(law_data):
+    return save_json(law_data, law_data['LawName'])
+
+def main(args=None):
+    if args is None:
+        args = parse_args("爬取桃園市法規")
+        configure(args)
     base_url = "https://law.tycg.gov.tw/"
     session = get_session()
+    checkpoint = open_checkpoint(args, 'taoyuan')
     
-    # 獲取所有法規的URL和總數
-    all_laws_url, total_laws = get_all_laws_url(session, base_url)
-    if not all_laws_url:
-        logging.error("Could not get all laws URL")
-        return
+    if checkpoint and checkpoint.is_complete('discovery'):
+        total_laws = checkpoint.count_pending('law')
+        all_law_links = checkpoint.iter_pending('law')
+        logging.info(f"Resuming from checkpoint with {total_laws} pending laws")
+    else:
+        # 獲取所有法規的URL和總數
+        all_laws_url, total_laws = get_all_laws_url(session, base_url)
+        if not all_laws_url:
+            logging.error("Could not get all laws URL")
+            return
+        
+        # 列表頁與法規內容同時抓取
+        all_law_links = iter_law_links(session, all_laws_url, base_url, total_laws, checkpoint,
+                                       args.workers, args.listing_page_size)
     
-    # 獲取所有法規連結
-    all_law_links = get_all_law_links(session, all_laws_url, base_url, total_laws)
+    # 「全部」列表只有一份，但抓取期間列表變動時，同一部法規可能出現在相鄰兩頁；排程前依 LawContent.aspx 的 id 去除重複
+    frontier = Frontier('taoyuan')
+    all_law_links = frontier.filter(all_law_links)
+    writer = open_writer(args, 'taoyuan', 'taoyuan_law_jsons', save_law)
+    if args.engine == 'async':
+        def on_result(law_info, law_data):
+            writer.write(law_data)
+            if checkpoint:
+                checkpoint.mark('law', law_info['url'], 'done')
+        run_async(all_law_links, get_law_content_async, on_result,
+                  headers=dict(session.headers), concurrency=args.concurrency, total=total_laws or None)
+        writer.close()
+        frontier.log_summary()
+        if checkpoint:
+            checkpoint.finish()
+        return
     
     # 處理所有法規內容
-    with tqdm(total=len(all_law_links), desc="Processing laws") as pbar:
-        successful_count = 0
-        failed_count = 0
-        
-        # 分批處理，每次5個法規
-        for i in range(0, len(all_law_links), 5):
-            batch = all_law_links[i:i+5]
-            
-            # 使用多線程處理每一批
-            with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-                futures = {executor.submit(get_law_content, law_info, session): law_info for law_info in batch}
-                
-                for future in concurrent.futures.as_completed(futures):
-                    law_info = futures[future]
-                    try:
-                        law_data = future.result()
-                        if law_data:
-                            filename = law_data['LawName']
-                            filepath = save_json(law_data, filename)
-                            logging.info(f"Saved law: {filename}")
-                            successful_count += 1
-                        else:
-                            failed_count += 1
-                            logging.warning(f"Failed to process: {law_info['name']}")
-                    except Exception as e:
-                        failed_count += 1
-                        logging.error(f"Exception processing {law_info['name']}: {e}")
-                    
-                    pbar.update(1)
+    successful_count = 0
+    failed_count = 0
+    stats = Throughput()
+    manifest = open_manifest(args, 'taoyuan')
+    
+    # 增量模式以列表頁的日期欄位作為指紋，不需額外請求
+    def process(law_info):
+        return fetch_if_changed(manifest, law_info['url'], lambda: law_info['date'],
+                                lambda: get_law_content(law_info, session))
+    
+    # 固定在途數量的工作佇列，任一法規完成即開始下一個
+    with window_for(args, "law.tycg.gov.tw") as window, tqdm(total=total_laws or None, desc="Processing laws") as pbar:
+        for law_info, law_data, error in window.imap_unordered(process, all_law_links):
+            if checkpoint:
+                checkpoint.mark('law', law_info['url'], 'failed' if law_data is None else 'done')
+            if law_data is UNCHANGED:
+                stats.skip()
+                pbar.update(1)
+                continue
+            if error:
+                failed_count += 1
+                logging.error(f"Exception processing {law_info['name']}: {error}")
+            elif law_data:
+                filename = law_data['LawName']
+                writer.write(law_data)
+                logging.info(f"Saved law: {filename}")
+                successful_count += 1
+            else:
+                failed_count += 1
+                logging.warning(f"Failed to process: {law_info['name']}")
             
-            # 批次處理完成後稍等，避免請求過快
-            time.sleep(random.uniform(1, 2))
+            stats.record(bool(law_data))
+            pbar.update(1)
     
+    writer.close()
+    if manifest:
+        manifest.save()
+    if checkpoint:
+        checkpoint.finish()
     logging.info(f"Completed! Successfully processed {successful_count} laws, failed: {failed_count}")
+    frontier.log_summary()
+    stats.log_summary("thread")
+    log_connection_stats(session)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file